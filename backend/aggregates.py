@@ -0,0 +1,463 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, bindparam, update, delete, insert, select, func, cast, Integer
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Dashboard aggregates: totals, sales per weekday and per-worker stats are kept in
+# summary tables so /admin/dashboard-stats never has to scan daily_records.
+# stats_cumulative holds running totals per day (overall and per worker), so the totals
+# of any date range are two lookups (see range_stats).
+# Every table is kept per location and for all locations together (location_id 0), so a
+# site's dashboard reads the same handful of rows as the global one.
+# Every write to daily_records must call apply() in the same transaction.
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+TOLERANCE = 1e-6
+ALL_LOCATIONS = 0
+ALL_WORKERS = ""
+CUMULATIVE_FIELDS = ("cash", "rides", "toys", "difference", "records")
+GRANULARITIES = ("day", "week", "month")
+
+
+def _as_date(date_value):
+    if not date_value:
+        return None
+    if isinstance(date_value, str):
+        try:
+            return datetime.strptime(date_value, "%Y-%m-%d").date()
+        except ValueError:
+            return None
+    if isinstance(date_value, datetime):
+        return date_value.date()
+    return date_value
+
+
+def _weekday(date_value):
+    date_value = _as_date(date_value)
+    return date_value.weekday() if date_value else None
+
+
+def snapshot(record):
+    # The fields of a record that feed the aggregates. Take it before mutating a record
+    # so the old contribution can be subtracted. record: a DailyRecord or a dict of its columns.
+    if isinstance(record, dict):
+        value = record.get
+    else:
+        def value(name):
+            return getattr(record, name)
+    return {
+        "location": value("location_id"),
+        "date": _as_date(value("date")),
+        "weekday": _weekday(value("date")),
+        "worker": (value("worker_name") or "").strip(),
+        "income": value("daily_cash_generated") or 0.0,
+        "rides": value("effective_rides") or 0,
+        "toys": value("toys_sold_total") or 0.0,
+        "difference": value("difference") or 0.0,
+    }
+
+
+def _locations(location):
+    # Records without a location (not yet migrated) only count towards the global totals
+    return [ALL_LOCATIONS] + ([location] if location else [])
+
+
+def _add(db: Session, model, where, key: dict, **deltas):
+    # UPDATE ... SET col = col + delta is atomic, so concurrent writers don't lose updates
+    values = {name: getattr(model, name) + delta for name, delta in deltas.items()}
+    result = db.execute(update(model).where(where).values(**values).execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        db.add(model(**key, **deltas))
+        db.flush()
+
+
+def apply(db: Session, snap: dict, sign: int = 1):
+    apply_many(db, [snap], sign)
+
+
+def apply_many(db: Session, snaps: list, sign: int = 1):
+    # Deltas are merged first, so a batch costs one statement per distinct location,
+    # weekday, worker and day rather than per record
+    totals = {}
+    weekdays = {}
+    workers = {}
+    cumulative = {}
+    for snap in snaps:
+        income = sign * snap["income"]
+        rides = sign * snap["rides"]
+        step = {"cash": income, "rides": rides, "toys": sign * snap["toys"],
+                "difference": sign * snap["difference"], "records": sign}
+        for location in _locations(snap["location"]):
+            total = totals.setdefault(location, {"total_revenue": 0.0, "total_rides": 0, "records_count": 0})
+            total["total_revenue"] += income
+            total["total_rides"] += rides
+            total["records_count"] += sign
+
+            if snap["weekday"] is not None:
+                key = (location, snap["weekday"])
+                weekdays[key] = weekdays.get(key, 0.0) + income
+
+            if snap["worker"]:
+                worker = workers.setdefault((location, snap["worker"]), {"total_rides": 0, "total_generated": 0.0, "records_count": 0})
+                worker["total_rides"] += rides
+                worker["total_generated"] += income
+                worker["records_count"] += sign
+
+            if snap["date"] is not None:
+                for name in [ALL_WORKERS] + ([snap["worker"]] if snap["worker"] else []):
+                    merged = cumulative.setdefault((location, name, snap["date"]), _zeros())
+                    for field, delta in step.items():
+                        merged[field] += delta
+
+    if not snaps:
+        return
+
+    for location, deltas in totals.items():
+        _add(db, models.StatsTotals, models.StatsTotals.location_id == location, {"location_id": location}, **deltas)
+
+    for (location, weekday), amount in weekdays.items():
+        _add(db, models.StatsWeekday,
+             and_(models.StatsWeekday.location_id == location, models.StatsWeekday.weekday == weekday),
+             {"location_id": location, "weekday": weekday}, amount=amount)
+
+    for (location, name), deltas in workers.items():
+        where = and_(models.StatsWorker.location_id == location, models.StatsWorker.name == name)
+        _add(db, models.StatsWorker, where, {"location_id": location, "name": name}, **deltas)
+        if deltas["records_count"] < 0:
+            db.execute(delete(models.StatsWorker).where(
+                where, models.StatsWorker.records_count <= 0
+            ).execution_options(synchronize_session=False))
+
+    _apply_cumulative(db, cumulative)
+
+
+def _apply_cumulative(db: Session, deltas: dict):
+    # deltas: {(location, worker, day): {field: delta}}. Per series (location and worker), a row at day X
+    # moves by the sum of the deltas on days <= X. Rows between the first and last changed
+    # day each get their own amount (one executemany UPDATE, new rows one INSERT); every
+    # later row moves by the full total in a single UPDATE over the suffix. So a series
+    # costs the same five statements for one record or a thousand.
+    table = models.StatsCumulative.__table__
+    fields = [table.c[field] for field in CUMULATIVE_FIELDS]
+    by_series = {}
+    for (location, worker, day), step in deltas.items():
+        by_series.setdefault((location, worker), {})[day] = step
+
+    for (location, worker), steps in by_series.items():
+        series = and_(table.c.location_id == location, table.c.worker == worker)
+        days = sorted(steps)
+        first, last = days[0], days[-1]
+        before = _cumulative_row(db, location, worker, table.c.day < first)
+        existing = {
+            row_day: dict(zip(CUMULATIVE_FIELDS, values))
+            for row_day, *values in db.execute(
+                select(table.c.day, *fields).where(series, table.c.day.between(first, last))
+            )
+        }
+
+        added = _zeros()
+        inserts = []
+        updates = []
+        for day in sorted(set(existing) | set(steps)):
+            if day in steps:
+                for field in CUMULATIVE_FIELDS:
+                    added[field] += steps[day][field]
+            if day in existing:
+                before = existing[day]
+                updates.append({"b_location": location, "b_worker": worker, "b_day": day, **{f"d_{field}": added[field] for field in CUMULATIVE_FIELDS}})
+            else:
+                # First record of this series on this day: running total before it, plus the batch
+                inserts.append({"location_id": location, "worker": worker, "day": day, **{field: before[field] + added[field] for field in CUMULATIVE_FIELDS}})
+
+        if inserts:
+            db.execute(insert(table), inserts)
+        if updates:
+            db.execute(
+                update(table).where(table.c.location_id == bindparam("b_location"), table.c.worker == bindparam("b_worker"),
+                                    table.c.day == bindparam("b_day"))
+                .values(**{field: table.c[field] + bindparam(f"d_{field}") for field in CUMULATIVE_FIELDS}),
+                updates
+            )
+        db.execute(
+            update(table).where(series, table.c.day > last)
+            .values(**{field: table.c[field] + added[field] for field in CUMULATIVE_FIELDS})
+        )
+
+
+def _cumulative_row(db: Session, location: int, worker: str, *conditions):
+    # Latest running totals matching the conditions (zeros before the first row); a plain
+    # column query so values updated in bulk earlier in the session are never stale
+    table = models.StatsCumulative
+    row = db.query(*(getattr(table, name) for name in CUMULATIVE_FIELDS)) \
+        .filter(table.location_id == location, table.worker == worker, *conditions).order_by(table.day.desc()).first()
+    return dict(zip(CUMULATIVE_FIELDS, row)) if row else _zeros()
+
+
+def _zeros():
+    return {name: 0 for name in CUMULATIVE_FIELDS}
+
+
+def _difference(a: dict, b: dict):
+    # Rounded so float running totals don't leak 1e-12 noise into the response
+    result = {}
+    for name in CUMULATIVE_FIELDS:
+        value = a[name] - b[name]
+        result[name] = round(value, 6) if isinstance(value, float) else value
+    return result
+
+
+def _period(day: date, granularity: str):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def range_stats(db: Session, start: date = None, end: date = None, granularity: str = "day", worker: str = None,
+                location: int = ALL_LOCATIONS):
+    # Totals for [start, end] are the running totals at `end` minus those before `start`:
+    # two index seeks whatever the range. The series reads one stats_cumulative row per
+    # day with records in the range and never touches daily_records.
+    table = models.StatsCumulative
+    worker = (worker or "").strip()
+
+    lower = _cumulative_row(db, location, worker, table.day < start) if start else _zeros()
+    upper = _cumulative_row(db, location, worker, table.day <= end) if end else _cumulative_row(db, location, worker)
+
+    query = db.query(table.day, *(getattr(table, name) for name in CUMULATIVE_FIELDS)) \
+        .filter(table.location_id == location, table.worker == worker)
+    if start:
+        query = query.filter(table.day >= start)
+    if end:
+        query = query.filter(table.day <= end)
+
+    buckets = {}
+    previous = lower
+    for row_day, *values in query.order_by(table.day):
+        current = dict(zip(CUMULATIVE_FIELDS, values))
+        period = _period(row_day, granularity)
+        if current["records"] != previous["records"]:  # skip days whose records were all deleted
+            buckets.setdefault(period, [previous, current])[1] = current
+        previous = current
+
+    # A bucket's values are its last running total minus the one before its first day
+    return {
+        "totals": _difference(upper, lower),
+        "series": [{"period": period.isoformat(), **_difference(last, before)} for period, (before, last) in buckets.items()],
+    }
+
+
+def read_stats(db: Session, location: int = ALL_LOCATIONS):
+    # Constant-size reads: one totals row, 7 weekday rows, one row per worker
+    totals = db.query(models.StatsTotals).filter(models.StatsTotals.location_id == location).first()
+    weekday_rows = {
+        row.weekday: row.amount
+        for row in db.query(models.StatsWeekday).filter(models.StatsWeekday.location_id == location)
+    }
+    return {
+        "total_revenue": totals.total_revenue if totals else 0.0,
+        "total_rides": totals.total_rides if totals else 0,
+        "records_count": totals.records_count if totals else 0,
+        "sales_by_weekday": {day: weekday_rows.get(i, 0.0) for i, day in enumerate(WEEKDAYS)},
+        "workers": {
+            row.name: {"rides": row.total_rides, "revenue": row.total_generated, "count": row.records_count}
+            for row in db.query(models.StatsWorker).filter(models.StatsWorker.location_id == location)
+        },
+    }
+
+
+def weekday_expr(db: Session, column):
+    # 0=Monday .. 6=Sunday
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.extract("isodow", column), Integer) - 1
+    # SQLite stores dates as YYYY-MM-DD text; strftime('%w') is 0=Sunday
+    return (cast(func.strftime("%w", column), Integer) + 6) % 7
+
+
+def _scope(location):
+    return [] if location == ALL_LOCATIONS else [models.DailyRecord.location_id == location]
+
+
+def locations_in_use(db: Session):
+    return [row[0] for row in db.query(models.DailyRecord.location_id).filter(
+        models.DailyRecord.location_id.isnot(None)).distinct().order_by(models.DailyRecord.location_id)]
+
+
+def compute_stats(db: Session, location: int = ALL_LOCATIONS):
+    # Live path: recompute everything from daily_records with GROUP BY queries,
+    # only the grouped rows are sent back by the database
+    scope = _scope(location)
+    income = func.coalesce(models.DailyRecord.daily_cash_generated, 0.0)
+    rides = func.coalesce(models.DailyRecord.effective_rides, 0)
+
+    total_revenue, total_rides, records_count = db.query(
+        func.coalesce(func.sum(income), 0.0),
+        func.coalesce(func.sum(rides), 0),
+        func.count(models.DailyRecord.id)
+    ).filter(*scope).one()
+
+    weekday = weekday_expr(db, models.DailyRecord.date)
+    sales_by_weekday = {day: 0.0 for day in WEEKDAYS}
+    weekday_rows = db.query(weekday, func.sum(income)).filter(weekday.isnot(None), *scope).group_by(weekday).all()
+    for day_index, amount in weekday_rows:
+        sales_by_weekday[WEEKDAYS[int(day_index)]] = float(amount or 0.0)
+
+    worker = func.trim(models.DailyRecord.worker_name)
+    worker_rows = db.query(worker, func.sum(rides), func.sum(income), func.count(models.DailyRecord.id)) \
+        .filter(worker.isnot(None), worker != "", *scope) \
+        .group_by(worker).all()
+    workers = {
+        name: {"rides": int(w_rides or 0), "revenue": float(w_income or 0.0), "count": count}
+        for name, w_rides, w_income, count in worker_rows
+    }
+
+    return {
+        "total_revenue": float(total_revenue),
+        "total_rides": int(total_rides),
+        "records_count": records_count,
+        "sales_by_weekday": sales_by_weekday,
+        "workers": workers,
+    }
+
+
+def recent_daily_stats(db: Session, days: int = 30, location: int = ALL_LOCATIONS):
+    # Last N records of a location, oldest first. Only three columns are fetched.
+    # All locations together: every site has its own record per day, so sum them by date
+    # (walking ix_daily_records_date_id) and keep the last N dates.
+    if location == ALL_LOCATIONS:
+        rows = db.query(
+            models.DailyRecord.date,
+            func.sum(models.DailyRecord.daily_cash_generated),
+            func.sum(models.DailyRecord.effective_rides)
+        ).group_by(models.DailyRecord.date).order_by(models.DailyRecord.date.desc()).limit(days).all()
+    else:
+        rows = db.query(
+            models.DailyRecord.date,
+            models.DailyRecord.daily_cash_generated,
+            models.DailyRecord.effective_rides
+        ).filter(*_scope(location)).order_by(models.DailyRecord.date.desc(), models.DailyRecord.id.desc()).limit(days).all()
+    return [
+        {"date": row_date.isoformat() if row_date else "Unknown", "total_income": income or 0.0, "total_rides": rides or 0}
+        for row_date, income, rides in reversed(rows)
+    ]
+
+
+def rebuild(db: Session):
+    # Recompute the summary tables from scratch, globally and for every location in use.
+    # Returns the global stats. Caller commits.
+    db.query(models.StatsTotals).delete(synchronize_session=False)
+    db.query(models.StatsWeekday).delete(synchronize_session=False)
+    db.query(models.StatsWorker).delete(synchronize_session=False)
+
+    for location in [ALL_LOCATIONS] + locations_in_use(db):
+        stats = compute_stats(db, location)
+        if location == ALL_LOCATIONS:
+            overall = stats
+        db.add(models.StatsTotals(
+            location_id=location,
+            total_revenue=stats["total_revenue"],
+            total_rides=stats["total_rides"],
+            records_count=stats["records_count"]
+        ))
+        db.add_all(
+            models.StatsWeekday(location_id=location, weekday=i, amount=stats["sales_by_weekday"][day])
+            for i, day in enumerate(WEEKDAYS)
+        )
+        db.add_all(
+            models.StatsWorker(location_id=location, name=name, total_rides=w["rides"], total_generated=w["revenue"],
+                               records_count=w["count"])
+            for name, w in stats["workers"].items()
+        )
+    db.flush()
+    rebuild_cumulative(db)
+    return overall
+
+
+def rebuild_cumulative(db: Session):
+    # One GROUP BY (day, location, worker) pass, running sums in Python, bulk insert. Caller commits.
+    table = models.StatsCumulative
+    record = models.DailyRecord
+    db.query(table).delete(synchronize_session=False)
+
+    worker = func.coalesce(func.trim(record.worker_name), "")
+    grouped = db.query(
+        record.date, record.location_id, worker,
+        func.sum(func.coalesce(record.daily_cash_generated, 0.0)),
+        func.sum(func.coalesce(record.effective_rides, 0)),
+        func.sum(func.coalesce(record.toys_sold_total, 0.0)),
+        func.sum(func.coalesce(record.difference, 0.0)),
+        func.count(record.id)
+    ).filter(record.date.isnot(None)).group_by(record.date, record.location_id, worker).order_by(record.date)
+
+    # A day's row for a series is written once all of that day's groups are added
+    running = {}
+    rows = []
+    touched = set()
+    last_day = None
+
+    def write_day():
+        for location, name in touched:
+            rows.append({"location_id": location, "worker": name, "day": last_day, **running[(location, name)]})
+        touched.clear()
+
+    for day, location, name, *values in grouped:
+        if day != last_day:
+            write_day()
+            last_day = day
+        for target in _locations(location):
+            for series in [(target, ALL_WORKERS)] + ([(target, name)] if name else []):
+                totals = running.setdefault(series, _zeros())
+                for field, value in zip(CUMULATIVE_FIELDS, values):
+                    totals[field] += value or 0
+                touched.add(series)
+    write_day()
+
+    for i in range(0, len(rows), 10000):
+        db.execute(insert(table), rows[i:i + 10000])
+    db.flush()
+
+
+def ensure(db: Session):
+    # Populate the summary tables the first time they are needed (e.g. after upgrading an existing DB)
+    totals = db.query(models.StatsTotals).filter(models.StatsTotals.location_id == ALL_LOCATIONS).first()
+    if totals is None or (totals.records_count and db.query(models.StatsCumulative.day).first() is None):
+        rebuild(db)
+        db.commit()
+
+
+def compare(stored: dict, live: dict):
+    # Returns a list of human-readable mismatches between the stored and live aggregates
+    problems = []
+
+    def check(label, a, b):
+        if abs((a or 0) - (b or 0)) > TOLERANCE:
+            problems.append(f"{label}: stored={a} live={b}")
+
+    for key in ("total_revenue", "total_rides", "records_count"):
+        check(key, stored[key], live[key])
+    for day in WEEKDAYS:
+        check(f"weekday {day}", stored["sales_by_weekday"][day], live["sales_by_weekday"][day])
+    for name in sorted(set(stored["workers"]) | set(live["workers"])):
+        s = stored["workers"].get(name, {})
+        l = live["workers"].get(name, {})
+        check(f"worker {name} rides", s.get("rides"), l.get("rides"))
+        check(f"worker {name} revenue", s.get("revenue"), l.get("revenue"))
+        check(f"worker {name} count", s.get("count"), l.get("count"))
+    return problems
+
+
+def compare_cumulative(db: Session, live: dict, location: int = ALL_LOCATIONS):
+    # The last running total of each series must equal the live all-time totals
+    problems = []
+    overall = _cumulative_row(db, location, ALL_WORKERS)
+    for field, key in (("cash", "total_revenue"), ("rides", "total_rides")):
+        if abs(overall[field] - live[key]) > TOLERANCE:
+            problems.append(f"cumulative {field}: stored={overall[field]} live={live[key]}")
+    for name, stats in live["workers"].items():
+        latest = _cumulative_row(db, location, name)
+        for field, key in (("cash", "revenue"), ("rides", "rides")):
+            if abs(latest[field] - stats[key]) > TOLERANCE:
+                problems.append(f"cumulative {name} {field}: stored={latest[field]} live={stats[key]}")
+    return problems
@@ -1,11 +1,15 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from . import models, schemas, database
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import models, schemas, database, cache
 
 # SECRET_KEY should be in env vars in production, but hardcoded for this local tool as requested
 SECRET_KEY = "dinocars_secret_key_change_me"
@@ -14,11 +18,50 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Authenticated users by username. Users change rarely, so protected endpoints skip the
+# users query on a hit. Every write to users must call invalidate_user().
+user_cache = cache.TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("USER_CACHE_TTL", "60"))
+)
+
+def invalidate_user(username: Optional[str]):
+    if username:
+        user_cache.invalidate(username)
+
+# bcrypt cost factor for new hashes; stored hashes with another cost are rehashed on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# bcrypt releases the GIL, so a small dedicated pool hashes in parallel and keeps the
+# event loop (and FastAPI's shared threadpool) free while logins are being checked
+password_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", "4")),
+    thread_name_prefix="bcrypt"
+)
+
 def verify_password(plain_password, hashed_password):
     return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
 def get_password_hash(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def hash_rounds(hashed_password: str):
+    # "$2b$12$<salt+hash>" -> 12
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+def needs_rehash(hashed_password: str):
+    return hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+async def verify_password_async(plain_password, hashed_password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -37,7 +80,15 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -54,10 +105,15 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError as e:
         print(f"Auth Error: JWT Validation failed: {e}")
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    user = user_cache.get(token_data.username)
     if user is None:
-        print(f"Auth Error: User {token_data.username} not found in DB")
-        raise credentials_exception
+        user = await get_user_by_username(db, token_data.username)
+        if user is None:
+            print(f"Auth Error: User {token_data.username} not found in DB")
+            raise credentials_exception
+        # Detached copy with its columns loaded; endpoints only read it
+        db.expunge(user)
+        user_cache.set(token_data.username, user)
     return user
 
 async def get_current_active_admin(current_user: models.User = Depends(get_current_user)):
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+# Runs the same load against the app with the async auth dependency (current) and with
+# the old synchronous one, reporting throughput and the worst event-loop stall.
+# Usage: python -m backend.benchmarks.async_auth [--requests 2000] [--concurrency 10]
+# Note: with the sync dependency, concurrency above the connection pool size (5 + 10 overflow)
+# can stall completely: the event loop blocks waiting for a connection that is only released
+# by a threadpool task, which needs the loop to finish.
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+import httpx
+from fastapi import Depends, HTTPException
+from jose import jwt
+from sqlalchemy.orm import Session
+
+from backend import main, models, database, auth
+
+
+async def sync_get_current_user(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(auth.get_db)):
+    # The pre-async dependency: a blocking query inside an async function
+    payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+    user = db.query(models.User).filter(models.User.username == payload.get("sub")).first()
+    if user is None:
+        raise HTTPException(status_code=401)
+    return user
+
+
+def seed():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if not db.query(models.User).filter(models.User.username == "bench").first():
+            db.add(models.User(username="bench", hashed_password=auth.get_password_hash("bench"), role="admin"))
+            db.commit()
+    finally:
+        db.close()
+
+
+async def loop_lag(stop: asyncio.Event, samples: list):
+    # Sleeps 1ms at a time; anything beyond that is time the loop was blocked
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        samples.append(time.perf_counter() - t0 - 0.001)
+
+
+async def load(total, concurrency, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    transport = httpx.ASGITransport(app=main.app)
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while not queue.empty():
+                queue.get_nowait()
+                t0 = time.perf_counter()
+                response = await client.get("/last-record", headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                assert response.status_code == 200, response.text
+
+        stop = asyncio.Event()
+        lag = []
+        lag_task = asyncio.create_task(loop_lag(stop, lag))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await lag_task
+
+    # The async pool is bound to this event loop; each asyncio.run() gets a fresh one
+    await database.async_engine.dispose()
+
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": max(lag, default=0.0) * 1000,
+    }
+
+
+def run(total, concurrency, modes):
+    seed()
+    token = auth.create_access_token({"sub": "bench", "role": "admin"})
+    print(f"{'mode':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max loop lag ms':>16}")
+    for mode in modes:
+        if mode == "sync":
+            main.app.dependency_overrides[auth.get_current_user] = sync_get_current_user
+        else:
+            main.app.dependency_overrides.clear()
+        result = asyncio.run(load(total, concurrency, token))
+        print(f"{mode:>6} {result['rps']:>8.0f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['max_loop_lag_ms']:>16.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync vs async auth dependency load test")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", choices=["sync", "async"], default=["sync", "async"])
+    args = parser.parse_args()
+    run(args.requests, args.concurrency, args.modes)
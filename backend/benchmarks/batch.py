@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Records/sec for N single POST /records/ calls vs one POST /records/batch of N items.
+# Usage: python -m backend.benchmarks.batch [--sizes 1 10 100 1000]
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from fastapi.testclient import TestClient
+
+from backend import main, database
+from backend.benchmarks import seed as seeder
+
+
+def payloads(count, start):
+    rows = seeder.daily_record_rows(count, start)
+    keep = ("total_accumulated_prev", "total_accumulated_today", "rides_today", "admin_rides", "effective_rides",
+            "expected_income", "cash_withdrawn", "cash_in_box", "card_payments", "total_counted", "status",
+            "difference", "daily_cash_generated", "toys_sold_details", "toys_sold_total", "worker_name")
+    return [{"date": row["date"].isoformat(), **{key: row[key] for key in keep}} for row in rows]
+
+
+def run(sizes):
+    seeder.seed(database.engine, users=2, years=1, schedule_density=0)
+    print(f"{'batch size':>10} {'single rec/s':>13} {'batch rec/s':>12} {'speedup':>8}")
+    with TestClient(main.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        start = date(2030, 1, 1)
+        for size in sizes:
+            items = payloads(size, start)
+            start += timedelta(days=size)
+            t0 = time.perf_counter()
+            for item in items:
+                assert client.post("/records/", json=item, headers=headers).status_code == 200
+            single = size / (time.perf_counter() - t0)
+
+            items = payloads(size, start)
+            start += timedelta(days=size)
+            t0 = time.perf_counter()
+            response = client.post("/records/batch", json=items, headers=headers)
+            batch = size / (time.perf_counter() - t0)
+            assert response.status_code == 200 and response.json()["created"] == size, response.text
+            print(f"{size:>10} {single:>13.0f} {batch:>12.0f} {batch / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Single vs batch record ingestion")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+    run(args.sizes)
@@ -0,0 +1,68 @@
+import argparse
+import os
+import tempfile
+import time
+
+# Odometer chain maintenance: recompute after an edit at the start, middle and end of the
+# history (window UPDATE vs the Python fallback), and a full verify() pass.
+# Usage: python -m backend.benchmarks.chain [--years 10] [--repeat 5]
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from sqlalchemy import select, update
+
+from backend import database, chain
+from backend.benchmarks import seed as seeder
+
+
+def positions(db):
+    rows = db.execute(select(chain.table.c.location_id, chain.table.c.date, chain.table.c.id).order_by(*chain.order)).all()
+    return {"start": rows[0], "middle": rows[len(rows) // 2], "end": rows[-1]}
+
+
+def edit(db, position, rides):
+    # What PUT /records/{id} does to the chain: change rides, then recompute the suffix
+    db.execute(update(chain.table).where(chain.table.c.id == position[2]).values(rides_today=rides))
+    return chain.recompute_after_change(db, position)
+
+
+def timed(call, repeat):
+    best = None
+    for i in range(repeat):
+        t0 = time.perf_counter()
+        result = call(i)
+        elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(years, repeat):
+    dataset = seeder.seed(database.engine, users=2, years=years, schedule_density=0)
+    print(f"{dataset['records']} daily records")
+    window = chain._window_update_supported
+    db = database.SessionLocal()
+    try:
+        print(f"{'edit at':<8} {'rows':>6} {'window ms':>10} {'python ms':>10}")
+        for name, position in positions(db).items():
+            chain._window_update_supported = window
+            ms_window, rows = timed(lambda i: edit(db, position, 50 + i % 2), repeat)
+            db.commit()
+            chain._window_update_supported = lambda db: False
+            ms_python, _ = timed(lambda i: edit(db, position, 50 + (i + 1) % 2), repeat)
+            db.commit()
+            print(f"{name:<8} {rows:>6} {ms_window:>10.2f} {ms_python:>10.2f}")
+        chain._window_update_supported = window
+
+        ms, (checked, problems) = timed(lambda i: chain.verify(db), repeat)
+        print(f"verify: {checked} records in {ms:.2f}ms, {len(problems)} problems")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Odometer chain recompute and verify")
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(args.years, args.repeat)
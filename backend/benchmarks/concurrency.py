@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# Mixed read/write load against the app on SQLite, once per engine profile. Each profile
+# runs in its own process because the engine settings are read at import time.
+# Usage: python -m backend.benchmarks.concurrency [--seconds 10] [--readers 8] [--writers 2] [--dir .]
+#   default: rollback journal, synchronous=FULL (SQLite's own defaults)
+#   tuned:   the profile from database.py (WAL, synchronous=NORMAL, mmap, cache)
+# Use --dir on the real disk: on tmpfs fsync is free and synchronous=FULL costs nothing.
+
+PROFILES = {
+    "default": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL",
+                "SQLITE_MMAP_SIZE": "0", "SQLITE_CACHE_SIZE": "-2000"},
+    "tuned": {},
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def record_payload(day):
+    return {
+        "date": day.isoformat(), "total_accumulated_prev": 0, "total_accumulated_today": 50,
+        "rides_today": 50, "admin_rides": 0, "effective_rides": 50, "expected_income": 200000,
+        "cash_withdrawn": 200000, "cash_in_box": 0, "card_payments": 0, "total_counted": 200000,
+        "status": "CUADRA", "difference": 0, "daily_cash_generated": 200000, "toys_sold_total": 0,
+        "worker_name": "Bench",
+    }
+
+
+def worker_process(seconds, readers, writers, years):
+    # Imported here: DATABASE_URL and the profile variables are set by the parent
+    from fastapi.testclient import TestClient
+    from backend import main, database
+    from backend.benchmarks import seed as seeder
+
+    main.versions.ENABLED = False
+    seeder.seed(database.engine, users=5, years=years, schedule_density=0.5)
+
+    reads, writes, errors = [], [], []
+    stop = threading.Event()
+
+    with TestClient(main.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        def reader():
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                response = client.get("/records/", params={"limit": 100}, headers=headers)
+                (reads if response.status_code == 200 else errors).append(time.perf_counter() - t0)
+
+        def writer(n):
+            day = date(2030, 1, 1) + timedelta(days=n * 100000)
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                response = client.post("/records/", json=record_payload(day), headers=headers)
+                (writes if response.status_code == 200 else errors).append(time.perf_counter() - t0)
+                day += timedelta(days=1)
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    print(json.dumps({
+        "reads_per_sec": len(reads) / seconds,
+        "writes_per_sec": len(writes) / seconds,
+        "read_p95_ms": percentile(reads, 95) * 1000,
+        "write_p95_ms": percentile(writes, 95) * 1000,
+        "errors": len(errors),
+    }))
+
+
+def run(seconds, readers, writers, years, directory):
+    print(f"{readers} readers (GET /records/), {writers} writers (POST /records/), {seconds}s per profile")
+    print(f"{'profile':<8} {'reads/s':>8} {'writes/s':>9} {'read p95 ms':>12} {'write p95 ms':>13} {'errors':>7}")
+    for name, overrides in PROFILES.items():
+        with tempfile.TemporaryDirectory(dir=directory) as tmp:
+            env = {**os.environ, **overrides, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}"}
+            output = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.concurrency", "--worker",
+                 "--seconds", str(seconds), "--readers", str(readers), "--writers", str(writers), "--years", str(years)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{name:<8} {result['reads_per_sec']:>8.0f} {result['writes_per_sec']:>9.1f} "
+              f"{result['read_p95_ms']:>12.2f} {result['write_p95_ms']:>13.2f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SQLite engine profile concurrency benchmark")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--dir", default=None, help="Where to create the benchmark databases")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker_process(args.seconds, args.readers, args.writers, args.years)
+    else:
+        run(args.seconds, args.readers, args.writers, args.years, args.dir)
@@ -0,0 +1,80 @@
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Staffing coverage over a year of dense schedules: the sweep in coverage.py vs counting
+# every minute of the opening hours against every shift of the day (what the client had
+# to do by hand), at growing numbers of users, plus GET /admin/coverage end to end.
+# Usage: python -m backend.benchmarks.coverage [--users 10 20 40] [--density 0.9]
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from fastapi.testclient import TestClient
+
+from backend import main, database, models, coverage
+from backend.benchmarks import seed as seeder
+
+
+def naive_gaps(shifts, start, end, min_staff):
+    # Understaffed minutes by brute force: O(days * opening minutes * shifts per day)
+    open_at, close_at = coverage.to_minutes(coverage.OPEN), coverage.to_minutes(coverage.CLOSE)
+    by_day = {}
+    for user_id, day, start_time, end_time in shifts:
+        by_day.setdefault(day, []).append((user_id, coverage.to_minutes(start_time), coverage.to_minutes(end_time)))
+    understaffed = 0
+    day = start
+    while day <= end:
+        day_shifts = by_day.get(day, [])
+        for minute in range(open_at, close_at):
+            staff = len({user_id for user_id, s, e in day_shifts if s <= minute < e})
+            if staff < min_staff:
+                understaffed += 1
+        day += timedelta(days=1)
+    return understaffed
+
+
+def timed(call):
+    t0 = time.perf_counter()
+    result = call()
+    return (time.perf_counter() - t0) * 1000, result
+
+
+def run(user_counts, density, min_staff):
+    dataset = seeder.seed(database.engine, users=max(user_counts), years=1, schedule_density=density)
+    start = date.fromisoformat(dataset["start"])
+    end = date.fromisoformat(dataset["end"])
+    db = database.SessionLocal()
+    try:
+        rows = db.query(models.Schedule.user_id, models.Schedule.date,
+                        models.Schedule.start_time, models.Schedule.end_time).all()
+    finally:
+        db.close()
+
+    print(f"{'users':>6} {'shifts':>7} {'sweep ms':>9} {'naive ms':>9} {'speedup':>8}")
+    for users in sorted(user_counts):
+        shifts = [row for row in rows if row[0] <= users]
+        sweep_ms, report = timed(lambda: coverage.compute(shifts, start, end, min_staff))
+        naive_ms, understaffed = timed(lambda: naive_gaps(shifts, start, end, min_staff))
+        assert report["understaffed_minutes"] == understaffed, (report["understaffed_minutes"], understaffed)
+        print(f"{users:>6} {len(shifts):>7} {sweep_ms:>9.1f} {naive_ms:>9.1f} {naive_ms / sweep_ms:>7.1f}x")
+
+    with TestClient(main.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        params = {"from": start.isoformat(), "to": end.isoformat(), "min_staff": min_staff}
+        main.versions.ENABLED = False
+        ms, response = timed(lambda: client.get("/admin/coverage", params=params, headers=headers))
+        assert response.status_code == 200, response.text
+        print(f"GET /admin/coverage, one year: {ms:.1f}ms, {len(response.content) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Staffing coverage sweep benchmark")
+    parser.add_argument("--users", type=int, nargs="+", default=[10, 20, 40])
+    parser.add_argument("--density", type=float, default=0.9, help="Share of days each user is scheduled")
+    parser.add_argument("--min-staff", type=int, default=3)
+    args = parser.parse_args()
+    run(args.users, args.density, args.min_staff)
@@ -0,0 +1,105 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, aggregates
+
+# Compares the old dashboard loop (load every DailyRecord, strptime + Python sums)
+# with the GROUP BY path in aggregates.compute_stats.
+# Usage: python -m backend.benchmarks.dashboard [--sizes 1000 100000 1000000]
+
+WORKERS = ["Nicolas", "Catalina", "Josefa", "Otro", ""]
+
+
+def loop_stats(db):
+    # Copy of the original get_dashboard_stats loop, kept as the baseline
+    records = db.query(models.DailyRecord).order_by(models.DailyRecord.date.asc()).all()
+    total_revenue = 0.0
+    total_rides = 0
+    sales_by_weekday = {day: 0.0 for day in aggregates.WEEKDAYS}
+    worker_stats = {}
+    for record in records:
+        income = record.daily_cash_generated or 0.0
+        rides = record.effective_rides or 0
+        total_revenue += income
+        total_rides += rides
+        try:
+            if record.date:
+                day_name = datetime.strptime(str(record.date), "%Y-%m-%d").strftime("%A")
+                if day_name in sales_by_weekday:
+                    sales_by_weekday[day_name] += income
+        except Exception:
+            pass
+        if record.worker_name:
+            w_name = record.worker_name.strip()
+            if w_name:
+                if w_name not in worker_stats:
+                    worker_stats[w_name] = {"rides": 0, "revenue": 0}
+                worker_stats[w_name]["rides"] += rides
+                worker_stats[w_name]["revenue"] += income
+    return total_revenue, total_rides, len(records), sales_by_weekday, worker_stats
+
+
+def seed(engine, rows):
+    rng = random.Random(42)
+    start = date(2000, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            rides = rng.randint(0, 120)
+            batch.append({
+                "date": start + timedelta(days=i % 20000),
+                "total_accumulated_prev": 0, "total_accumulated_today": 0,
+                "rides_today": rides, "admin_rides": 0, "effective_rides": rides,
+                "expected_income": rides * 4000.0, "cash_withdrawn": 0.0, "cash_in_box": 0.0,
+                "card_payments": 0.0, "total_counted": 0.0, "status": "CUADRA", "difference": 0.0,
+                "daily_cash_generated": rides * 4000.0, "toys_sold_details": "", "toys_sold_total": 0.0,
+                "worker_name": rng.choice(WORKERS), "submitted_by": "bench",
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(models.DailyRecord), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(models.DailyRecord), batch)
+
+
+def timed(fn, db, repeat):
+    best = None
+    for _ in range(repeat):
+        db.expunge_all()
+        t0 = time.perf_counter()
+        fn(db)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def run(sizes, repeat):
+    print(f"{'rows':>10} {'loop (s)':>10} {'sql (s)':>10} {'speedup':>8}")
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            models.Base.metadata.create_all(bind=engine)
+            seed(engine, rows)
+            db = sessionmaker(bind=engine)()
+            try:
+                loop_time = timed(loop_stats, db, repeat)
+                sql_time = timed(aggregates.compute_stats, db, repeat)
+            finally:
+                db.close()
+                engine.dispose()
+        print(f"{rows:>10} {loop_time:>10.3f} {sql_time:>10.3f} {loop_time / sql_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard aggregation benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.sizes, args.repeat)
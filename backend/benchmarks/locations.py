@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# Per-site query cost as sites are added. Each run seeds a fresh database with N locations
+# (every location gets its own years of records and its own workers) and times requests
+# scoped to location 1; with location-first indexes the numbers should not move with N.
+# Each location count runs in its own process because DATABASE_URL is read at import time.
+# Usage: python -m backend.benchmarks.locations [--locations 1 4 16] [--years 2] [--iterations 100]
+
+END = "2025-12-31"
+MONTH = "2025-12"
+
+
+def worker_process(locations, years, iterations):
+    # Imported here: DATABASE_URL is set by the parent
+    from fastapi.testclient import TestClient
+    from backend import main, database
+    from backend.benchmarks import seed as seeder
+
+    main.versions.ENABLED = False
+    seeder.seed(database.engine, users=1 + 4 * locations, years=years, schedule_density=0.8, locations=locations)
+
+    site = {"location_id": 1}
+    requests = {
+        "records_month": ("/records/", {**site, "month": MONTH}),
+        "last_record": ("/last-record", site),
+        "dashboard": ("/admin/dashboard-stats", site),
+        "range_stats": ("/admin/stats", {**site, "from": f"{END[:4]}-01-01", "to": END, "granularity": "month"}),
+        "schedules_month": ("/schedules/", {**site, "from": f"{MONTH}-01", "to": END}),
+    }
+    results = {}
+    with TestClient(main.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for name, (path, params) in requests.items():
+            latencies = []
+            for i in range(iterations + 5):
+                t0 = time.perf_counter()
+                response = client.get(path, params=params, headers=headers)
+                if i >= 5:
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                assert response.status_code == 200, response.text
+            results[name] = sorted(latencies)[len(latencies) // 2]
+    print(json.dumps(results))
+
+
+def run(location_counts, years, iterations):
+    print(f"p50 ms of requests scoped to location 1, {years} years of records per location")
+    rows = {}
+    for locations in location_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}"}
+            output = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.locations", "--worker", "--locations", str(locations),
+                 "--years", str(years), "--iterations", str(iterations)],
+                env=env, capture_output=True, text=True, check=True
+            ).stdout
+        rows[locations] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'request':<16}" + "".join(f"{f'{n} sites':>10}" for n in location_counts))
+    for name in rows[location_counts[0]]:
+        print(f"{name:<16}" + "".join(f"{rows[n][name]:>10.2f}" for n in location_counts))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-location query cost vs number of locations")
+    parser.add_argument("--locations", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--years", type=float, default=2)
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.worker:
+        worker_process(args.locations[0], args.years, args.iterations)
+    else:
+        run(args.locations, args.years, args.iterations)
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# Login throughput at several concurrency levels, with bcrypt on the dedicated pool
+# (current) and inline on the event loop (previous behaviour).
+# Usage: python -m backend.benchmarks.login [--requests 100] [--levels 1 10 50]
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+import httpx
+
+from backend import main, models, database, auth
+
+
+async def verify_inline(plain_password, hashed_password):
+    return auth.verify_password(plain_password, hashed_password)
+
+
+def seed():
+    models.Base.metadata.create_all(bind=database.engine)
+    db = database.SessionLocal()
+    try:
+        if not db.query(models.User).filter(models.User.username == "bench").first():
+            db.add(models.User(username="bench", hashed_password=auth.get_password_hash("bench"), role="worker"))
+            db.commit()
+    finally:
+        db.close()
+
+
+async def load(total, concurrency):
+    transport = httpx.ASGITransport(app=main.app)
+    remaining = [total]
+    lag = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                response = await client.post("/token", data={"username": "bench", "password": "bench"})
+                assert response.status_code == 200, response.text
+
+        async def ticker(stop):
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                await asyncio.sleep(0.001)
+                lag.append(time.perf_counter() - t0 - 0.001)
+
+        stop = asyncio.Event()
+        tick = asyncio.create_task(ticker(stop))
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await tick
+
+    # The async pool is bound to this event loop; each asyncio.run() gets a fresh one
+    await database.async_engine.dispose()
+
+    return total / elapsed, max(lag, default=0.0) * 1000
+
+
+def run(total, levels):
+    seed()
+    original = auth.verify_password_async
+    print(f"bcrypt cost {auth.BCRYPT_ROUNDS}, {auth.password_executor._max_workers} hash workers")
+    print(f"{'mode':>7} {'conc':>5} {'logins/s':>9} {'max loop lag ms':>16}")
+    for mode, verify in (("inline", verify_inline), ("pool", original)):
+        auth.verify_password_async = verify
+        for concurrency in levels:
+            rps, lag_ms = asyncio.run(load(total, concurrency))
+            print(f"{mode:>7} {concurrency:>5} {rps:>9.1f} {lag_ms:>16.1f}")
+    auth.verify_password_async = original
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Login throughput benchmark")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+    run(args.requests, args.levels)
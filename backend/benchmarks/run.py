@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# End-to-end endpoint benchmark. Seeds a fresh SQLite database with synthetic data
+# (see seed.py), drives the real app in-process and reports latency percentiles and
+# SQL queries per request for each scenario.
+# Usage:
+#   python -m backend.benchmarks.run [--users 10] [--years 3] [--density 0.8] [--iterations 200]
+#   python -m backend.benchmarks.run --output results.json
+#   python -m backend.benchmarks.run --compare baseline.json [--threshold 0.2]
+# With --compare the exit code is 1 when a scenario's p95 or query count regressed.
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from backend import main, database
+from backend.benchmarks import seed as seeder
+
+# Conditional GETs would turn repeated reads into 304s; measure the full path
+main.versions.ENABLED = False
+
+END = date(2025, 12, 31)
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        for engine in (database.engine, database.async_engine.sync_engine):
+            event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def on_execute(self, *args):
+        self.count += 1
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def scenarios(client, headers, users):
+    month = END.strftime("%Y-%m")
+    first_page = client.get("/records/", params={"limit": 100}, headers=headers)
+    cursor = first_page.headers.get("X-Next-Cursor")
+    worker_ids = list(range(2, users + 1)) or [1]
+
+    def bulk(i):
+        # A new month every iteration, so each request really inserts rows
+        start = END + timedelta(days=1 + 31 * i)
+        return client.post("/schedules/bulk", headers=headers, json={
+            "user_ids": worker_ids, "start_date": start.isoformat(),
+            "end_date": (start + timedelta(days=30)).isoformat(),
+            "days_of_week": [0, 1, 2, 3, 4, 5, 6], "start_time": "10:00", "end_time": "20:00",
+        })
+
+    # name -> (call(i), iteration share); bcrypt makes /token slow by design
+    return {
+        "token": (lambda i: client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}), 0.05),
+        "records": (lambda i: client.get("/records/", params={"limit": 100}, headers=headers), 1),
+        "records_cursor": (lambda i: client.get("/records/", params={"limit": 100, "cursor": cursor}, headers=headers), 1),
+        "records_month": (lambda i: client.get("/records/", params={"month": month}, headers=headers), 1),
+        "last_record": (lambda i: client.get("/last-record", headers=headers), 1),
+        "dashboard_stats": (lambda i: client.get("/admin/dashboard-stats", headers=headers), 1),
+        "range_stats": (lambda i: client.get("/admin/stats", params={
+            "from": f"{END.year}-01-01", "to": END.isoformat(), "granularity": "month"}, headers=headers), 1),
+        "users": (lambda i: client.get("/users/", headers=headers), 0.25),
+        "users_month": (lambda i: client.get("/users/", params={
+            "schedules_from": f"{month}-01", "schedules_to": END.isoformat()}, headers=headers), 1),
+        "users_no_schedules": (lambda i: client.get("/users/", params={"include_schedules": False}, headers=headers), 1),
+        "schedules_month": (lambda i: client.get("/schedules/", params={
+            "from": f"{month}-01", "to": END.isoformat()}, headers=headers), 1),
+        "coverage_month": (lambda i: client.get("/admin/coverage", params={
+            "from": f"{month}-01", "to": END.isoformat(), "min_staff": 2}, headers=headers), 1),
+        "schedules_bulk": (bulk, 0.25),
+    }
+
+
+def measure(call, iterations, warmup, counter):
+    for i in range(warmup):
+        call(-1 - i)
+    latencies = []
+    queries = []
+    for i in range(iterations):
+        before = counter.count
+        t0 = time.perf_counter()
+        response = call(i)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        queries.append(counter.count - before)
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return {
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "queries_per_request": round(sum(queries) / len(queries), 2),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(users, years, density, iterations, warmup, only):
+    print(f"Seeding {users} users, {years} years of records, schedule density {density}...")
+    t0 = time.perf_counter()
+    dataset = seeder.seed(database.engine, users=users, years=years, schedule_density=density, end=END)
+    print(f"Seeded in {time.perf_counter() - t0:.1f}s")
+
+    counter = QueryCounter()
+    results = {}
+    with TestClient(main.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        print(f"{'scenario':<20} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        for name, (call, share) in scenarios(client, headers, users).items():
+            if only and name not in only:
+                continue
+            n = max(5, int(iterations * share))
+            stats = measure(call, n, min(warmup, n), counter)
+            results[name] = stats
+            print(f"{name:<20} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['queries_per_request']:>8.1f}")
+
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "dataset": dataset,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    # Latency is noisy, so only p95 beyond the threshold counts; query counts must not grow
+    regressions = []
+    print(f"\n{'scenario':<20} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'queries':>12}")
+    for name, now in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            print(f"{name:<20} {'(new)':>9}")
+            continue
+        change = (now["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        queries = f"{base['queries_per_request']:g} -> {now['queries_per_request']:g}"
+        flag = ""
+        if change > threshold:
+            flag = " REGRESSION"
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f}ms -> {now['p95_ms']:.2f}ms")
+        if now["queries_per_request"] > base["queries_per_request"]:
+            flag = " REGRESSION"
+            regressions.append(f"{name}: queries {queries}")
+        print(f"{name:<20} {base['p95_ms']:>9.2f} {now['p95_ms']:>9.2f} {change:>+7.0%} {queries:>12}{flag}")
+    if baseline.get("meta", {}).get("dataset") != current["meta"]["dataset"]:
+        print("Warning: the baseline was recorded with a different dataset.")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Endpoint latency and query-count benchmark")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--density", type=float, default=0.8, help="Share of days each user is scheduled")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --output")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p95 slowdown (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run(args.users, args.years, args.density, args.iterations, args.warmup, args.only)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions.")
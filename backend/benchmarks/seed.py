@@ -0,0 +1,89 @@
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, auth, aggregates
+
+# Synthetic data generator for the benchmarks: locations, users, one DailyRecord per day and
+# location with a consistent odometer chain per location, and dense Schedules.
+
+WORKERS = ["Nicolas", "Catalina", "Josefa", "Otro", ""]
+SHIFTS = [("10:00", "17:30"), ("12:30", "20:00"), ("10:00", "20:00")]
+PASSWORD = "bench"
+BATCH = 10000
+
+
+def daily_record_rows(count, start=date(2000, 1, 1), rng=None):
+    rng = rng or random.Random(42)
+    counter = 0
+    for i in range(count):
+        rides = rng.randint(0, 120)
+        admin_rides = rng.randint(0, 3) if rides else 0
+        effective = rides - admin_rides
+        income = effective * 4000.0
+        prev, counter = counter, counter + rides
+        yield {
+            "date": start + timedelta(days=i),
+            "created_at": datetime(2000, 1, 1) + timedelta(days=i),
+            "total_accumulated_prev": prev, "total_accumulated_today": counter,
+            "rides_today": rides, "admin_rides": admin_rides, "effective_rides": effective,
+            "expected_income": income, "cash_withdrawn": income, "cash_in_box": 0.0,
+            "card_payments": 0.0, "total_counted": income, "status": "CUADRA", "difference": 0.0,
+            "daily_cash_generated": income, "toys_sold_details": "", "toys_sold_total": 0.0,
+            "worker_name": rng.choice(WORKERS), "submitted_by": "bench",
+        }
+
+
+def _insert(conn, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.execute(insert(model), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(model), batch)
+
+
+def seed(engine, users=10, years=3, schedule_density=0.8, end=date(2025, 12, 31), rng_seed=42, locations=1):
+    # Returns a summary of what was created. The first user is an admin called "bench" with
+    # access to every location; the other users are spread over the locations.
+    rng = random.Random(rng_seed)
+    days = int(years * 365)
+    start = end - timedelta(days=days - 1)
+    # Hash once: bcrypt is the slow part and every user shares the password
+    hashed = auth.get_password_hash(PASSWORD)
+
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _insert(conn, models.Location, ({"id": i + 1, "name": f"Site {i + 1}"} for i in range(locations)))
+        user_location = {i + 1: None if i == 0 else 1 + (i - 1) % locations for i in range(users)}
+        _insert(conn, models.User, (
+            {"id": user_id, "username": "bench" if user_id == 1 else f"worker{user_id - 1}", "hashed_password": hashed,
+             "role": "admin" if user_id == 1 else "worker", "location_id": location_id}
+            for user_id, location_id in user_location.items()
+        ))
+        for location_id in range(1, locations + 1):
+            _insert(conn, models.DailyRecord, (
+                {**row, "location_id": location_id} for row in daily_record_rows(days, start, rng)
+            ))
+        _insert(conn, models.Schedule, (
+            {"user_id": user_id, "date": start + timedelta(days=d), "location_id": user_location[user_id] or 1,
+             "start_time": shift[0], "end_time": shift[1]}
+            for user_id in range(1, users + 1)
+            for d in range(days)
+            if rng.random() < schedule_density
+            for shift in [rng.choice(SHIFTS)]
+        ))
+
+    db = sessionmaker(bind=engine)()
+    try:
+        aggregates.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+
+    return {"users": users, "locations": locations, "records": days * locations, "start": start.isoformat(),
+            "end": end.isoformat(), "schedule_density": schedule_density}
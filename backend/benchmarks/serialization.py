@@ -0,0 +1,92 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import List
+
+# Compares the list endpoints' fast path (row tuples -> dicts -> orjson) with the previous
+# one (ORM objects -> pydantic orm_mode -> jsonable_encoder -> json), both through the app.
+# Usage: python -m backend.benchmarks.serialization [--rows 10000] [--repeat 10]
+
+_tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from fastapi import Depends
+from fastapi.testclient import TestClient
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+
+from backend import main, models, schemas, database, auth, fastjson
+from backend.benchmarks import seed as seeder
+
+main.versions.ENABLED = False
+
+
+# The pre-fast-path endpoints, kept as the baseline
+@main.app.get("/bench/legacy-records", response_model=List[schemas.DailyRecord])
+def legacy_records(limit: int = 100, db: Session = Depends(main.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    query = db.query(models.DailyRecord).order_by(models.DailyRecord.date.desc(), models.DailyRecord.id.desc())
+    return query.limit(limit).all()
+
+
+@main.app.get("/bench/legacy-users", response_model=List[schemas.User])
+def legacy_users(limit: int = 100, db: Session = Depends(main.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    return db.query(models.User).options(selectinload(models.User.schedules)).order_by(models.User.id).limit(limit).all()
+
+
+def seed(rows):
+    # rows daily records, plus 100 users with rows / 100 schedules each
+    models.Base.metadata.create_all(bind=database.engine)
+    hashed = auth.get_password_hash(seeder.PASSWORD)
+    start = date(2000, 1, 1)
+    with database.engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": i, "username": "bench" if i == 1 else f"worker{i}", "hashed_password": hashed, "role": "admin" if i == 1 else "worker"}
+            for i in range(1, 101)
+        ])
+        conn.execute(insert(models.DailyRecord), list(seeder.daily_record_rows(rows, start)))
+        conn.execute(insert(models.Schedule), [
+            {"user_id": 1 + n % 100, "date": start + timedelta(days=n // 100), "start_time": "10:00", "end_time": "20:00"}
+            for n in range(rows)
+        ])
+
+
+def timed(client, path, params, headers, repeat):
+    samples = []
+    body = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        response = client.get(path, params=params, headers=headers)
+        samples.append(time.perf_counter() - t0)
+        assert response.status_code == 200, response.text
+        body = response.json()
+    return statistics.median(samples) * 1000, body
+
+
+def run(rows, repeat):
+    seed(rows)
+    encoder = "orjson" if fastjson.orjson is not None else "json (orjson not installed)"
+    print(f"{rows} records, 100 users with {rows} schedules; median of {repeat}; encoder: {encoder}")
+    print(f"{'endpoint':<10} {'legacy ms':>10} {'fast ms':>9} {'speedup':>8} {'same body':>10}")
+    with TestClient(main.app) as client:
+        token = client.post("/token", data={"username": "bench", "password": seeder.PASSWORD}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        cases = [
+            ("records", "/bench/legacy-records", "/records/", {"limit": rows}),
+            ("users", "/bench/legacy-users", "/users/", {"limit": 100}),
+        ]
+        for name, legacy_path, fast_path, params in cases:
+            legacy_ms, legacy_body = timed(client, legacy_path, params, headers, repeat)
+            fast_ms, fast_body = timed(client, fast_path, params, headers, repeat)
+            same = "yes" if legacy_body == fast_body else "NO"
+            print(f"{name:<10} {legacy_ms:>10.1f} {fast_ms:>9.1f} {legacy_ms / fast_ms:>7.1f}x {same:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="List endpoint serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,79 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Cold start benchmark: each run is a fresh interpreter that imports backend.main and
+# runs the startup bootstrap, like a free-tier host waking up. The first run starts on
+# an empty database; the rest reuse it (the usual restart). Exits 1 when a median goes
+# over its budget, so it can gate a deploy.
+# Usage: python -m backend.benchmarks.startup [--runs 5] [--import-budget-ms 1000] [--startup-budget-ms 300]
+#        python -m backend.benchmarks.startup --profile   # slowest imports (python -X importtime)
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+from backend import main, bootstrap
+t1 = time.perf_counter()
+bootstrap.run()
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "startup_ms": (t2 - t1) * 1000}))
+"""
+
+
+def child(env, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+
+
+def slowest_imports(env, top=15):
+    # -X importtime writes "import time: self | cumulative | module" to stderr
+    rows = []
+    for line in child(env, "-X", "importtime").stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), int(parts[0].split(":")[1]), parts[2].rstrip()))
+    print(f"\n{'cumulative ms':>14} {'self ms':>8}  module")
+    # Only top-level imports of the child, otherwise cumulative times are double counted
+    for cumulative, own, module in sorted((r for r in rows if r[2].startswith("   ") and not r[2].startswith("    ")), reverse=True)[:top]:
+        print(f"{cumulative / 1000:>14.1f} {own / 1000:>8.1f}  {module.strip()}")
+
+
+def run(runs, import_budget, startup_budget, profile):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}", "BACKEND_URL": ""}
+        results = [json.loads(child(env).stdout.strip().splitlines()[-1]) for _ in range(runs + 1)]
+        if profile:
+            slowest_imports(env)
+
+    first, warm = results[0], results[1:]
+    import_ms = statistics.median(r["import_ms"] for r in warm)
+    startup_ms = statistics.median(r["startup_ms"] for r in warm)
+    print(f"\n{'':<24} {'import ms':>10} {'startup ms':>11}")
+    print(f"{'first start (empty db)':<24} {first['import_ms']:>10.0f} {first['startup_ms']:>11.0f}")
+    print(f"{f'restart (median of {runs})':<24} {import_ms:>10.0f} {startup_ms:>11.0f}")
+    print(f"{'budget':<24} {import_budget:>10.0f} {startup_budget:>11.0f}")
+
+    over = []
+    if import_ms > import_budget:
+        over.append(f"import {import_ms:.0f}ms > {import_budget:.0f}ms")
+    if startup_ms > startup_budget:
+        over.append(f"startup {startup_ms:.0f}ms > {startup_budget:.0f}ms")
+    return over
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import time and startup budget check")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--startup-budget-ms", type=float, default=300)
+    parser.add_argument("--profile", action="store_true", help="Also list the slowest imports")
+    args = parser.parse_args()
+
+    over = run(args.runs, args.import_budget_ms, args.startup_budget_ms, args.profile)
+    if over:
+        print(f"\nOver budget: {'; '.join(over)}")
+        sys.exit(1)
+    print("\nWithin budget.")
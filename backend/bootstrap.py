@@ -0,0 +1,82 @@
+import os
+import time
+
+from sqlalchemy import inspect, func
+
+from . import models, database, auth, aggregates
+
+# Everything the app needs before serving, run once from the startup event. Each step
+# checks first and only does work when something is missing, so a restart on an
+# existing database costs a couple of cheap queries.
+
+DEFAULT_LOCATION = os.getenv("DEFAULT_LOCATION", "Principal")
+# Where records, schedules and users written without a location go (the oldest location)
+default_location_id = None
+
+
+def ensure_schema(engine):
+    # One catalog query; create_all would issue a has_table() per table.
+    # Column changes on existing tables are handled by the migration scripts.
+    existing = set(inspect(engine).get_table_names())
+    missing = [table for table in models.Base.metadata.sorted_tables if table.name not in existing]
+    if missing:
+        models.Base.metadata.create_all(bind=engine, tables=missing)
+        print(f"Created tables: {', '.join(table.name for table in missing)}")
+    return missing
+
+
+def ensure_location(db):
+    location_id = db.query(func.min(models.Location.id)).scalar()
+    if location_id is None:
+        location = models.Location(name=DEFAULT_LOCATION)
+        db.add(location)
+        db.commit()
+        location_id = location.id
+        print(f"Created location: {DEFAULT_LOCATION}")
+    return location_id
+
+
+def ensure_admin(db):
+    # Seed the default admin on empty databases (e.g. ephemeral SQLite on Render)
+    if db.query(models.User.id).filter(models.User.role == "admin").first():
+        return False
+    if db.query(models.User.id).filter(models.User.username == "admin").first():
+        print("WARNING: No admin found and the username 'admin' is taken; not seeding.")
+        return False
+    print("WARNING: No admin found. Seeding default admin user.")
+    db.add(models.User(
+        username="admin",
+        hashed_password=auth.get_password_hash("admin123"),  # Default password
+        role="admin",
+        default_start_time="09:00",
+        default_end_time="18:00"
+    ))
+    db.commit()
+    print("Admin user seeded successfully.")
+    return True
+
+
+def run():
+    global default_location_id
+    started = time.perf_counter()
+    ensure_schema(database.engine)
+    db = database.SessionLocal()
+    try:
+        try:
+            default_location_id = ensure_location(db)
+        except Exception as e:
+            print(f"Error creating the default location: {e}")
+            db.rollback()
+        try:
+            ensure_admin(db)
+        except Exception as e:
+            print(f"Error seeding admin: {e}")
+            db.rollback()
+        try:
+            aggregates.ensure(db)
+        except Exception as e:
+            print(f"Error building dashboard aggregates: {e}")
+            db.rollback()
+    finally:
+        db.close()
+    print(f"Startup completed in {(time.perf_counter() - started) * 1000:.0f}ms")
@@ -0,0 +1,136 @@
+import sqlite3
+from sqlalchemy import select, update, func, tuple_, and_, or_
+from sqlalchemy.orm import Session
+
+from . import models
+
+# The odometer chain of daily_records. Each location has its own ride counter, so there is
+# one chain per location; in (date, id) order every record continues the previous one of
+# its location, the same way CuadrarCaja fills the form:
+#   total_accumulated_prev  = previous record's total_accumulated_today
+#   total_accumulated_today = total_accumulated_prev + rides_today
+# rides_today is the ground truth. The first record's total_accumulated_prev is the
+# odometer's starting value. Records without a date are not part of the chain.
+#
+# recompute() rewrites the chain from a position onwards with one UPDATE driven by a
+# running SUM() window; write endpoints call it after inserting, editing or deleting a
+# record so later days never keep stale counters. verify() checks the whole history in
+# a single streaming pass.
+
+table = models.DailyRecord.__table__
+dated = table.c.date.isnot(None)
+rides = func.coalesce(table.c.rides_today, 0)
+order = (table.c.date, table.c.id)
+
+
+def _at(location_id):
+    # Records not yet assigned to a location form a chain of their own
+    return table.c.location_id.is_(None) if location_id is None else table.c.location_id == location_id
+
+
+def _window_update_supported(db: Session):
+    # UPDATE ... FROM needs SQLite 3.33 (window functions 3.25); PostgreSQL has both
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite3.sqlite_version_info >= (3, 33, 0)
+    return True
+
+
+def recompute(db: Session, location_id, from_date=None, from_id: int = 0):
+    # Rewrites every dated record of the location at or after (from_date, from_id);
+    # from_date=None means its whole history. Returns the number of rows changed. Caller commits.
+    chain = and_(dated, _at(location_id))
+    if from_date is None:
+        suffix = chain
+        anchor = None
+    else:
+        position = tuple_(table.c.date, table.c.id)
+        suffix = and_(chain, position >= tuple_(from_date, from_id))
+        anchor = db.execute(
+            select(table.c.total_accumulated_today).where(chain, position < tuple_(from_date, from_id))
+            .order_by(table.c.date.desc(), table.c.id.desc()).limit(1)
+        ).scalar()
+    if anchor is None:
+        # The suffix starts the history: keep the first record's starting counter
+        first = db.execute(select(table.c.id, table.c.total_accumulated_prev).where(suffix).order_by(*order).limit(1)).first()
+        if first is None:
+            return 0
+        anchor = first.total_accumulated_prev or 0
+
+    if not _window_update_supported(db):
+        return _recompute_in_python(db, suffix, anchor)
+
+    running = select(
+        table.c.id,
+        (anchor + func.sum(rides).over(order_by=order)).label("today"),
+        rides.label("rides"),
+    ).where(suffix).subquery()
+    new_prev = running.c.today - running.c.rides
+    result = db.execute(
+        update(table)
+        .where(table.c.id == running.c.id)
+        .where(or_(
+            table.c.total_accumulated_today.is_distinct_from(running.c.today),
+            table.c.total_accumulated_prev.is_distinct_from(new_prev),
+        ))
+        .values(total_accumulated_today=running.c.today, total_accumulated_prev=new_prev)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def _recompute_in_python(db: Session, suffix, anchor):
+    # Same result for old SQLite builds: one ordered read, one executemany UPDATE
+    changes = []
+    today = anchor
+    for row_id, prev, current, row_rides in db.execute(
+        select(table.c.id, table.c.total_accumulated_prev, table.c.total_accumulated_today, rides)
+        .where(suffix).order_by(*order)
+    ):
+        new_prev, today = today, today + row_rides
+        if (prev, current) != (new_prev, today):
+            changes.append({"id": row_id, "total_accumulated_prev": new_prev, "total_accumulated_today": today})
+    if changes:
+        db.execute(update(models.DailyRecord), changes)
+    return len(changes)
+
+
+def recompute_after_change(db: Session, *positions):
+    # positions: (location_id, date, id) of every place a chain changed (a record's old and
+    # new spot); each location's chain is rebuilt from its earliest one. Undated positions
+    # are ignored.
+    earliest = {}
+    for location_id, row_date, row_id in positions:
+        if row_date is not None:
+            earliest[location_id] = min(earliest.get(location_id, (row_date, row_id)), (row_date, row_id))
+    if not earliest:
+        return 0
+    db.flush()
+    return sum(recompute(db, location_id, *start) for location_id, start in earliest.items())
+
+
+def verify(db: Session, batch_size: int = 5000):
+    # One ordered streaming pass over the whole history, O(n) time and constant memory.
+    # Returns (records checked, problems); each problem names the record and what it should hold.
+    problems = []
+    checked = 0
+    location = previous_today = None
+    result = db.execute(
+        select(table.c.location_id, table.c.id, table.c.date, table.c.total_accumulated_prev,
+               table.c.total_accumulated_today, rides)
+        .where(dated).order_by(table.c.location_id, *order)
+        .execution_options(yield_per=batch_size)
+    )
+    for location_id, row_id, row_date, prev, today, row_rides in result:
+        checked += 1
+        if checked == 1 or location_id != location:
+            # First record of a location's chain
+            location, previous_today = location_id, None
+        # Each check is local, so one bad record shows up once instead of breaking every later one
+        if previous_today is not None and prev != previous_today:
+            problems.append({"location_id": location_id, "id": row_id, "date": row_date, "field": "total_accumulated_prev",
+                             "found": prev, "expected": previous_today})
+        if prev is None or today != prev + row_rides:
+            problems.append({"location_id": location_id, "id": row_id, "date": row_date, "field": "total_accumulated_today",
+                             "found": today, "expected": (prev or 0) + row_rides})
+        previous_today = today
+    return checked, problems
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from sqlalchemy.orm import Session
+
+from . import models
+
+# Staffing coverage from schedules. Every shift becomes two events (start +1, end -1) and
+# one sort of all events for the date range, ordered by (date, minute, ends first), drives
+# a single sweep: O(n log n) in the number of shifts, whatever the window length.
+#  - timeline: headcount (people on shift) segments covering the opening hours of each day
+#  - gaps: the timeline segments with fewer than min_staff people
+#  - double_bookings: a user on two overlapping shifts (only possible on databases that
+#    predate uq_schedules_user_date, or with shifts added outside the API)
+# Times are HH:MM strings, like Schedule.start_time/end_time. A shift ending at the minute
+# another starts is a handover, not an overlap.
+
+OPEN = "10:00"
+CLOSE = "20:00"
+
+
+def to_minutes(value):
+    # "HH:MM" -> minutes since midnight, None when unparseable
+    try:
+        hours, minutes = value.split(":")
+        total = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+    return total if 0 <= total <= 24 * 60 else None
+
+
+def to_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _events(shifts):
+    # shifts: (user_id, date, start_time, end_time). Ends sort before starts at the same minute.
+    events = []
+    skipped = 0
+    for user_id, day, start_time, end_time in shifts:
+        start = to_minutes(start_time)
+        end = to_minutes(end_time)
+        if user_id is None or day is None or start is None or end is None or end <= start:
+            skipped += 1
+            continue
+        events.append((day, start, 1, user_id))
+        events.append((day, end, -1, user_id))
+    events.sort()
+    return events, skipped
+
+
+def _segment(timeline, start, end, staff):
+    if timeline and timeline[-1]["staff"] == staff and timeline[-1]["end"] == start:
+        timeline[-1]["end"] = end
+    else:
+        timeline.append({"start": start, "end": end, "staff": staff})
+
+
+def _sweep_day(events, open_at, close_at, min_staff):
+    timeline = []
+    double_bookings = []
+    staff = 0
+    cursor = open_at
+    active = {}   # user_id -> shifts in progress
+    overlap = {}  # user_id -> minute the current double booking started
+    for minute, delta, user_id in events:
+        # Headcount is constant between events; only the opening hours go into the timeline
+        clipped = min(max(minute, open_at), close_at)
+        if clipped > cursor:
+            _segment(timeline, cursor, clipped, staff)
+            cursor = clipped
+        # Headcount is people on shift, so a double-booked user still counts once
+        count = active.get(user_id, 0) + delta
+        active[user_id] = count
+        if delta > 0 and count == 1:
+            staff += 1
+        elif delta < 0 and count == 0:
+            staff -= 1
+        elif delta > 0 and count == 2:
+            overlap[user_id] = minute
+        elif delta < 0 and count == 1:
+            double_bookings.append({"user_id": user_id, "start": overlap.pop(user_id), "end": minute})
+    if close_at > cursor:
+        _segment(timeline, cursor, close_at, staff)
+    gaps = [segment for segment in timeline if segment["staff"] < min_staff]
+    return timeline, gaps, double_bookings
+
+
+def compute(shifts, start, end, min_staff=1, open_time=OPEN, close_time=CLOSE):
+    # Pure function over (user_id, date, start_time, end_time) rows; every day in
+    # [start, end] is reported, days without shifts as one gap over the opening hours.
+    open_at = to_minutes(open_time)
+    close_at = to_minutes(close_time)
+    if open_at is None or close_at is None or close_at <= open_at:
+        raise ValueError("open/close must be HH:MM with open before close")
+    events, skipped = _events(shift for shift in shifts if shift[1] is None or start <= shift[1] <= end)
+
+    days = []
+    double_bookings = []
+    understaffed = 0
+    index = 0
+    day = start
+    while day <= end:
+        day_events = []
+        while index < len(events) and events[index][0] == day:
+            _, minute, delta, user_id = events[index]
+            day_events.append((minute, delta, user_id))
+            index += 1
+        timeline, gaps, doubles = _sweep_day(day_events, open_at, close_at, min_staff)
+        minutes = sum(gap["end"] - gap["start"] for gap in gaps)
+        understaffed += minutes
+        days.append({
+            "date": day.isoformat(),
+            "timeline": [_as_times(segment) for segment in timeline],
+            "gaps": [_as_times(gap) for gap in gaps],
+            "understaffed_minutes": minutes,
+        })
+        double_bookings += [{"date": day.isoformat(), **_as_times(double)} for double in doubles]
+        day += timedelta(days=1)
+
+    return {
+        "date_from": start.isoformat(), "date_to": end.isoformat(),
+        "min_staff": min_staff, "open": to_time(open_at), "close": to_time(close_at),
+        "shifts": len(events) // 2, "skipped_shifts": skipped,
+        "understaffed_minutes": understaffed,
+        "days": days, "double_bookings": double_bookings,
+    }
+
+
+def _as_times(segment):
+    return {**segment, "start": to_time(segment["start"]), "end": to_time(segment["end"])}
+
+
+def coverage(db: Session, start, end, min_staff=1, open_time=OPEN, close_time=CLOSE, location_id=None):
+    # One range scan for the whole window, on ix_schedules_location_date_user. The API always
+    # passes a location (staffing is per site); None scans ix_schedules_date_user for all of them
+    query = db.query(
+        models.Schedule.user_id, models.Schedule.date, models.Schedule.start_time, models.Schedule.end_time
+    ).filter(models.Schedule.date >= start, models.Schedule.date <= end)
+    if location_id is not None:
+        query = query.filter(models.Schedule.location_id == location_id)
+    return compute(query.all(), start, end, min_staff, open_time, close_time)
@@ -1,4 +1,6 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -16,11 +18,70 @@ if SQLALCHEMY_DATABASE_URL:
 if SQLALCHEMY_DATABASE_URL.startswith("postgres://"):
     SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+# Engine profile, tunable from the environment.
+# SQLite: WAL lets readers keep going while a write commits; synchronous=NORMAL is
+# durable in WAL mode except for the last transactions on power loss (not on a crash).
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # negative = KiB, so 64 MiB
+}
+# PostgreSQL: pre-ping costs a round-trip per checkout; with pool_recycle below the
+# server's idle timeout it can be turned off (DB_POOL_PRE_PING=0)
+POOL_SETTINGS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "30")),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "1") == "1",
+}
+
+def engine_options():
+    if IS_SQLITE:
+        # A local file never drops connections, so pre-ping is pure overhead
+        return {"pool_pre_ping": False}
+    return dict(POOL_SETTINGS)
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {},
-    pool_pre_ping=True
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **engine_options()
 )
+if IS_SQLITE:
+    event.listen(engine, "connect", apply_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def to_async_url(url: str):
+    # Same database through an asyncio driver: aiosqlite for SQLite, asyncpg for PostgreSQL
+    url = make_url(url)
+    if url.drivername.startswith("sqlite"):
+        return url.set(drivername="sqlite+aiosqlite")
+    if url.drivername.startswith("postgresql"):
+        # asyncpg takes "ssl" instead of libpq's "sslmode" and doesn't know channel_binding
+        query = dict(url.query)
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        query.pop("channel_binding", None)
+        return url.set(drivername="postgresql+asyncpg", query=query)
+    return url
+
+# Async engine for the code paths that run on the event loop (auth dependencies, /token).
+# Plain "def" endpoints keep using SessionLocal; FastAPI runs them in its threadpool.
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), **engine_options())
+if IS_SQLITE:
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
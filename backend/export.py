@@ -0,0 +1,137 @@
+import csv
+import io
+import tempfile
+from datetime import date, datetime
+from sqlalchemy import select
+
+from . import models, database
+
+# Streaming export of daily_records. Rows are read with a server-side cursor in
+# batches of BATCH_SIZE and written out batch by batch, so memory stays flat no
+# matter how much history is exported.
+
+BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+COLUMNS = [column.name for column in models.DailyRecord.__table__.columns]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def iter_batches(conditions):
+    # Runs inside the response generator, after the request's own session is closed,
+    # so it opens its own session for the duration of the stream
+    table = models.DailyRecord.__table__
+    query = select(table).where(*conditions).order_by(table.c.date, table.c.id)
+    db = database.SessionLocal()
+    try:
+        result = db.execute(query.execution_options(stream_results=True, yield_per=BATCH_SIZE))
+        for batch in result.partitions():
+            yield batch
+    finally:
+        db.close()
+
+
+def stream_csv(conditions):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in iter_batches(conditions):
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx(conditions):
+    from openpyxl import Workbook
+
+    # write_only keeps rows out of memory; the zip container is only complete after
+    # save(), so it is built in a temp file and then streamed from disk
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("daily_records")
+    sheet.append(COLUMNS)
+    for batch in iter_batches(conditions):
+        for row in batch:
+            sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as tmp:
+        workbook.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class _ChunkSink:
+    # Write-only file object for pyarrow: collects bytes between row groups and keeps
+    # counting the absolute position, which the Parquet footer offsets depend on
+    closed = False
+
+    def __init__(self):
+        self.position = 0
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def stream_parquet(conditions):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {int: pa.int64(), float: pa.float64(), str: pa.string(), date: pa.date32(), datetime: pa.timestamp("us")}
+    schema = pa.schema([
+        (column.name, arrow_types[column.type.python_type]) for column in models.DailyRecord.__table__.columns
+    ])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in iter_batches(conditions):
+            columns = list(zip(*batch))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=schema.field(name).type) for name, values in zip(COLUMNS, columns)],
+                schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+STREAMS = {"csv": stream_csv, "xlsx": stream_xlsx, "parquet": stream_parquet}
@@ -0,0 +1,54 @@
+import json
+from datetime import date, datetime
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fast response path for large lists. Endpoints select plain columns, zip the row tuples
+# into dicts and return them through respond(); a returned Response skips FastAPI's
+# response_model validation and jsonable_encoder pass, while response_model on the
+# route still documents the payload in OpenAPI. Keys come from the pydantic schema's
+# field list, so the JSON has the same shape as before.
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content)
+        # Without orjson: still a single pass, just a slower encoder
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def respond(content, response: Response = None):
+    fast = FastJSONResponse(content)
+    if response is not None:
+        # Headers set on the injected Response (ETag, cursors) are not applied when the
+        # endpoint returns its own Response, so carry them over
+        fast.raw_headers += [(k, v) for k, v in response.raw_headers if k != b"content-length"]
+    return fast
+
+
+def fields(schema, exclude=()):
+    return [name for name in schema.__fields__ if name not in exclude]
+
+
+def columns(model, names, **overrides):
+    # Column expressions in schema field order; overrides replace a column by an expression
+    table = model.__table__
+    return [overrides[name].label(name) if name in overrides else table.c[name] for name in names]
+
+
+def as_dicts(names, rows):
+    return [dict(zip(names, row)) for row in rows]
@@ -1,92 +1,150 @@
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
 import pandas as pd
-from sqlalchemy.orm import Session
 from backend.database import SessionLocal, engine
-from backend import models
-from datetime import datetime
+from backend import models, aggregates, bootstrap
+
+# Imports the historical monthly workbooks (ventas_YYYY-MM.xlsx) into daily_records.
+# Usage:
+#   python -m backend.import_data ~/DinoCars/                  # every .xlsx in a directory
+#   python -m backend.import_data "~/DinoCars/ventas_2025-*.xlsx" --workers 4
+#   python -m backend.import_data ~/DinoCars/Norte/ --location 2   # default: the first location
+# Workbooks are parsed in parallel processes; the odometer chain is computed with
+# vectorized pandas operations and new rows are written with one bulk insert.
+
+# Spreadsheet column -> DailyRecord column
+INT_COLUMNS = {
+    'Total acumulado dinosaurios': 'total_accumulated_today',
+    'Vueltas': 'rides_today',
+    'Vueltas administrativas': 'admin_rides',
+    'Vueltas efectivas': 'effective_rides',
+}
+FLOAT_COLUMNS = {
+    'Ingresos esperados': 'expected_income',
+    'Efectivo retirado': 'cash_withdrawn',
+    'Efectivo en caja': 'cash_in_box',
+    'Pagos en tarjeta': 'card_payments',
+    'Total contabilizado': 'total_counted',
+    'Diferencia': 'difference',
+    'Efectivo diario generado': 'daily_cash_generated',
+    'Juguetes vendidos': 'toys_sold_total',
+}
 
-# Bind engine
-models.Base.metadata.create_all(bind=engine)
+def find_workbooks(paths):
+    files = []
+    for path in paths:
+        path = os.path.expanduser(path)
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, "*.xlsx"))
+        elif any(ch in path for ch in "*?["):
+            files += glob.glob(path)
+        else:
+            files.append(path)
+    # Skip Excel lock files (~$ventas.xlsx)
+    return sorted({f for f in files if not os.path.basename(f).startswith("~$")})
 
-def import_data():
-    file_path = "/Users/nicolasrbarra/development/pyton/DinoCars/ventas_2025-07.xlsx"
+def parse_workbook(file_path):
+    # Runs in a worker process: returns a frame with DailyRecord column names
     df = pd.read_excel(file_path)
-    
-    # Fill NaN with 0 or appropriate defaults
-    df = df.fillna(0)
-    
-    # Coerce numeric columns
-    numeric_cols = ['Total acumulado dinosaurios', 'Vueltas', 'Vueltas administrativas', 'Vueltas efectivas', 
-                    'Ingresos esperados', 'Efectivo retirado', 'Efectivo en caja', 'Pagos en tarjeta', 
-                    'Total contabilizado', 'Diferencia', 'Efectivo diario generado', 'Juguetes vendidos']
-    
-    for col in numeric_cols:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
-    
+    out = pd.DataFrame({'date': pd.to_datetime(df['Fecha'], errors='coerce')})
+
+    missing = pd.Series(0, index=df.index)
+    for source, target in INT_COLUMNS.items():
+        values = df[source] if source in df.columns else missing
+        out[target] = pd.to_numeric(values, errors='coerce').fillna(0).astype('int64')
+    for source, target in FLOAT_COLUMNS.items():
+        values = df[source] if source in df.columns else missing
+        out[target] = pd.to_numeric(values, errors='coerce').fillna(0).astype('float64')
+
+    status = df['Estado caja'] if 'Estado caja' in df.columns else pd.Series(index=df.index, dtype=object)
+    out['status'] = status.where(status.notna() & (status.astype(str).str.strip() != ""), 'PENDIENTE').astype(str)
+
+    out = out.dropna(subset=['date'])
+    out['date'] = out['date'].dt.date
+    return out
+
+def build_records(frame, existing):
+    # existing: {date: total_accumulated_today} already stored in the database
+    frame = frame.sort_values('date', kind='stable').drop_duplicates(subset='date', keep='last').reset_index(drop=True)
+    is_new = ~frame['date'].isin(existing.keys())
+
+    # For dates already in the DB the stored counter wins, so the chain continues from it
+    totals = frame['total_accumulated_today'].where(is_new, frame['date'].map(existing)).astype('int64')
+    frame['total_accumulated_today'] = totals
+
+    # prev = previous day's counter; when unknown (first row) or zero, infer it as today - rides
+    prev = totals.shift(1).fillna(0).astype('int64')
+    frame['total_accumulated_prev'] = prev.where(prev != 0, totals - frame['rides_today'])
+
+    new_rows = frame[is_new].copy()
+    new_rows['toys_sold_details'] = "Importado desde Excel"
+    new_rows['worker_name'] = "Importado"
+    new_rows['submitted_by'] = "admin"
+    new_rows['created_at'] = datetime.utcnow()
+    return new_rows, int((~is_new).sum())
+
+def import_data(paths, workers=None, location_id=None):
+    started = time.perf_counter()
+    files = find_workbooks(paths)
+    if not files:
+        print("No workbooks found.")
+        return
+
+    print(f"Parsing {len(files)} workbook(s)...")
+    if len(files) == 1:
+        frames = [parse_workbook(files[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(parse_workbook, files))
+    frame = pd.concat(frames, ignore_index=True)
+    parsed_at = time.perf_counter()
+
+    models.Base.metadata.create_all(bind=engine)
     db = SessionLocal()
-    
     try:
-        # Sort by date to ensure correct order
-        df['Fecha'] = pd.to_datetime(df['Fecha'], errors='coerce')
-        df = df.dropna(subset=['Fecha'])
-        df = df.sort_values('Fecha')
-        
-        prev_accumulated = 0
-        
-        for index, row in df.iterrows():
-            # Check if record already exists
-            date_str = row['Fecha'].strftime('%Y-%m-%d')
-            existing = db.query(models.DailyRecord).filter(models.DailyRecord.date == date_str).first()
-            if existing:
-                print(f"Skipping {date_str}, already exists.")
-                prev_accumulated = existing.total_accumulated_today
-                continue
-            
-            # Calculate prev accumulated if not available (logic: current total - current rides)
-            # Or use the previous row's total if available.
-            # In the excel: 'Total acumulado dinosaurios' is likely the END of day counter.
-            
-            total_accumulated_today = int(row.get('Total acumulado dinosaurios', 0))
-            rides_today = int(row.get('Vueltas', 0))
-            
-            # If this is the first record imported and we don't have prev, we can infer it
-            if prev_accumulated == 0:
-                 prev_accumulated = total_accumulated_today - rides_today
-            
-            record = models.DailyRecord(
-                date=date_str,
-                total_accumulated_prev=prev_accumulated,
-                total_accumulated_today=total_accumulated_today,
-                rides_today=rides_today,
-                admin_rides=int(row.get('Vueltas administrativas', 0)),
-                effective_rides=int(row.get('Vueltas efectivas', 0)),
-                expected_income=float(row.get('Ingresos esperados', 0)),
-                cash_withdrawn=float(row.get('Efectivo retirado', 0)),
-                cash_in_box=float(row.get('Efectivo en caja', 0)),
-                card_payments=float(row.get('Pagos en tarjeta', 0)),
-                total_counted=float(row.get('Total contabilizado', 0)),
-                status=row.get('Estado caja', 'PENDIENTE'),
-                difference=float(row.get('Diferencia', 0)),
-                daily_cash_generated=float(row.get('Efectivo diario generado', 0)),
-                toys_sold_details="Importado desde Excel",
-                toys_sold_total=float(row.get('Juguetes vendidos', 0)),
-                worker_name="Importado",
-                submitted_by="admin",
-                created_at=datetime.utcnow()
-            )
-            
-            db.add(record)
-            prev_accumulated = total_accumulated_today
-            print(f"Imported {date_str}")
-            
+        if location_id is None:
+            location_id = bootstrap.ensure_location(db)
+        elif not db.query(models.Location.id).filter(models.Location.id == location_id).first():
+            print(f"Error: location {location_id} does not exist.")
+            return
+
+        # One query for every stored date of this location in the imported range
+        existing = dict(
+            db.query(models.DailyRecord.date, models.DailyRecord.total_accumulated_today).filter(
+                models.DailyRecord.location_id == location_id,
+                models.DailyRecord.date >= frame['date'].min(),
+                models.DailyRecord.date <= frame['date'].max()
+            ).all()
+        ) if len(frame) else {}
+
+        new_rows, skipped = build_records(frame, existing)
+        new_rows['location_id'] = location_id
+        if len(new_rows):
+            db.bulk_insert_mappings(models.DailyRecord, new_rows.to_dict(orient='records'))
+            # The bulk insert bypasses the per-record aggregate updates
+            aggregates.rebuild(db)
         db.commit()
-        print("Import completed successfully.")
-        
     except Exception as e:
         print(f"Error: {e}")
         db.rollback()
+        return
     finally:
         db.close()
 
+    elapsed = time.perf_counter() - started
+    print(f"Parsed {len(frame)} rows in {parsed_at - started:.2f}s.")
+    print(f"Imported {len(new_rows)} records into location {location_id}, skipped {skipped} existing dates.")
+    print(f"Import completed in {elapsed:.2f}s ({len(frame) / elapsed:.0f} rows/sec).")
+
 if __name__ == "__main__":
-    import_data()
+    parser = argparse.ArgumentParser(description="Import monthly sales workbooks into daily_records")
+    parser.add_argument("paths", nargs="+", help="Workbook files, directories or glob patterns")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--location", type=int, default=None, help="Location id (default: the first location)")
+    args = parser.parse_args()
+    import_data(args.paths, args.workers, args.location)
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+from . import database, aggregates, versions
+
+# Periodic background jobs on the app's event loop. Jobs are registered with
+# @scheduler.job(...); the startup event calls scheduler.start() and the shutdown event
+# scheduler.stop(), which cancels the loops and closes the shared HTTP client.
+# Every worker process runs its own scheduler; keep jobs safe to run more than once.
+# Blocking work (database, files) goes through asyncio.to_thread so the loop stays free.
+
+
+class Job:
+    def __init__(self, name, func, interval, jitter, initial_delay, enabled):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter  # fraction of the interval, spreads runs across restarts/workers
+        self.initial_delay = interval if initial_delay is None else initial_delay
+        self.enabled = enabled
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_duration_ms = None
+        self.last_error = None
+        self.next_run = None
+
+    def delay(self, base):
+        return max(0.0, base * (1 + random.uniform(-self.jitter, self.jitter)))
+
+    def status(self):
+        return {
+            "name": self.name,
+            "enabled": self.enabled,
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started": self.last_started,
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+            "next_run": self.next_run,
+        }
+
+
+class Scheduler:
+    def __init__(self):
+        self.jobs = {}
+        self.tasks = []
+        self.http = None
+
+    def job(self, name, interval, jitter=0.1, initial_delay=None, enabled=True):
+        def register(func):
+            self.jobs[name] = Job(name, func, interval, jitter, initial_delay, enabled)
+            return func
+        return register
+
+    async def start(self):
+        if self.tasks:
+            return
+        import httpx  # not needed on the request path; keeps it out of the import time
+
+        # One pooled client for every job that talks HTTP
+        self.http = httpx.AsyncClient(timeout=httpx.Timeout(10.0), limits=httpx.Limits(max_connections=10))
+        for job in self.jobs.values():
+            if job.enabled:
+                self.tasks.append(asyncio.create_task(self._loop(job), name=f"job:{job.name}"))
+        enabled = [job.name for job in self.jobs.values() if job.enabled]
+        print(f"Scheduler started: {', '.join(enabled) or 'no jobs enabled'}")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        if self.http is not None:
+            await self.http.aclose()
+            self.http = None
+
+    async def _loop(self, job):
+        delay = job.delay(job.initial_delay)
+        while True:
+            job.next_run = datetime.utcfromtimestamp(time.time() + delay).isoformat(timespec="seconds")
+            await asyncio.sleep(delay)
+            await self.run_job(job)
+            delay = job.delay(job.interval)
+
+    async def run_job(self, job):
+        job.running = True
+        job.last_started = datetime.utcnow().isoformat(timespec="seconds")
+        started = time.perf_counter()
+        try:
+            await job.func(self)
+            job.last_error = None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            job.failures += 1
+            job.last_error = f"{type(e).__name__}: {e}"
+            print(f"Job {job.name} failed: {e}")
+        finally:
+            job.runs += 1
+            job.running = False
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    def status(self):
+        return [job.status() for job in self.jobs.values()]
+
+
+scheduler = Scheduler()
+
+
+# --- Jobs ---
+
+BACKEND_URL = os.getenv("BACKEND_URL")
+BACKUP_DIR = os.getenv("BACKUP_DIR")
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+
+
+@scheduler.job("keep_alive", interval=int(os.getenv("KEEP_ALIVE_INTERVAL", str(14 * 60))), jitter=0, enabled=bool(BACKEND_URL))
+async def keep_alive(scheduler):
+    # Free-tier hosts sleep after 15 minutes without traffic; no jitter, a late ping lets it sleep
+    response = await scheduler.http.get(f"{BACKEND_URL}/health")
+    response.raise_for_status()
+
+
+def refresh_aggregates_sync():
+    db = database.SessionLocal()
+    try:
+        # All locations together, then each location on its own
+        problems = []
+        for location in [aggregates.ALL_LOCATIONS] + aggregates.locations_in_use(db):
+            live = aggregates.compute_stats(db, location)
+            problems += aggregates.compare(aggregates.read_stats(db, location), live) + aggregates.compare_cumulative(db, live, location)
+        if problems:
+            print(f"Dashboard aggregates drifted ({len(problems)} differences); rebuilding.")
+            aggregates.rebuild(db)
+            db.commit()
+            versions.bump("daily_records")
+    finally:
+        db.close()
+
+
+@scheduler.job("refresh_aggregates", interval=int(os.getenv("AGGREGATE_REFRESH_INTERVAL", str(6 * 3600))))
+async def refresh_aggregates(scheduler):
+    # Catches writes made outside the API (import/migration scripts)
+    await asyncio.to_thread(refresh_aggregates_sync)
+
+
+def backup_sqlite_sync():
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    path = os.path.join(BACKUP_DIR, f"dinocars-{datetime.utcnow():%Y%m%d-%H%M%S}.db")
+    source = database.engine.raw_connection()
+    try:
+        target = sqlite3.connect(path)
+        try:
+            # Online backup: consistent copy while the app keeps reading and writing
+            source.driver_connection.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+    backups = sorted(f for f in os.listdir(BACKUP_DIR) if f.startswith("dinocars-") and f.endswith(".db"))
+    for old in backups[:-BACKUP_KEEP]:
+        os.remove(os.path.join(BACKUP_DIR, old))
+
+
+@scheduler.job("sqlite_backup", interval=int(os.getenv("BACKUP_INTERVAL", str(24 * 3600))),
+               enabled=bool(BACKUP_DIR) and database.IS_SQLITE)
+async def sqlite_backup(scheduler):
+    await asyncio.to_thread(backup_sqlite_sync)
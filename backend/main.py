@@ -1,44 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Body, Depends, HTTPException, Query, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from jose import jwt
+from sqlalchemy import func, cast, insert, String
 from sqlalchemy.orm import Session
-from typing import List
-import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, List
+from pydantic import ValidationError
 import os
-from datetime import timedelta, datetime
+from datetime import timedelta, datetime, date as date_type
 
-from . import models, schemas, database, auth
-
-# Create tables
-models.Base.metadata.create_all(bind=database.engine)
+from . import models, schemas, database, auth, aggregates, pagination, export, versions, metrics, bootstrap, jobs, fastjson, chain, coverage
 
 app = FastAPI(title="DinoCars API")
 
-# Auto-Seed Admin on Startup (for ephemeral DBs like Render SQLite)
+# Schema, default admin and dashboard aggregates; each step is skipped when already in place.
+# Then the background jobs (keep-alive, aggregate refresh, backups), stopped on shutdown.
 @app.on_event("startup")
-def startup_event():
-    db = database.SessionLocal()
-    try:
-        # Check if admin exists
-        admin = db.query(models.User).filter(models.User.role == "admin").first()
-        if not admin:
-            print("WARNING: No admin found. Seeding default admin user.")
-            hashed_pw = auth.get_password_hash("admin123") # Default password
-            admin_user = models.User(
-                username="admin", 
-                hashed_password=hashed_pw, 
-                role="admin",
-                default_start_time="09:00",
-                default_end_time="18:00"
-            )
-            db.add(admin_user)
-            db.commit()
-            print("Admin user seeded successfully.")
-    except Exception as e:
-        print(f"Error seeding admin: {e}")
-    finally:
-        db.close()
+async def startup_event():
+    bootstrap.run()
+    await jobs.scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await jobs.scheduler.stop()
 
 # CORS
 origins = [
@@ -52,8 +38,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[pagination.NEXT_CURSOR_HEADER, "ETag"],
 )
 
+# Metrics (added last so it wraps everything, CORS included)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(database.engine, "sync")
+    metrics.instrument_engine(database.async_engine.sync_engine, "async")
+
 # Dependency
 def get_db():
     db = database.SessionLocal()
@@ -62,12 +55,78 @@ def get_db():
     finally:
         db.close()
 
+# --- Locations ---
+# Users with a location_id only ever see and write that location; users without one
+# (admins running several sites) pick one with ?location_id= or see all of them.
+
+def scoped_location(current_user: models.User, location_id: int = None):
+    if current_user.location_id is not None:
+        if location_id is not None and location_id != current_user.location_id:
+            raise HTTPException(status_code=403, detail="Not authorized for this location")
+        return current_user.location_id
+    return location_id
+
+def check_owner(current_user: models.User, location_id: int = None):
+    # Before changing an existing row: site-bound users may only touch rows of their own
+    # site, never another site's or unassigned (global) ones
+    if current_user.location_id is not None and location_id != current_user.location_id:
+        raise HTTPException(status_code=403, detail="Not authorized for this location")
+
+def check_global(current_user: models.User):
+    # Managing the sites themselves is left to admins of every location
+    if current_user.location_id is not None:
+        raise HTTPException(status_code=403, detail="Only admins of every location can manage locations")
+
+def check_location(db: Session, location_id: int = None):
+    if location_id is not None and not db.query(models.Location.id).filter(models.Location.id == location_id).first():
+        raise HTTPException(status_code=400, detail=f"Location {location_id} does not exist")
+    return location_id
+
+def writable_location(db: Session, current_user: models.User, location_id: int = None):
+    # The location a new row goes to: the requested one, the user's, or the default one
+    location_id = scoped_location(current_user, location_id)
+    if location_id is None:
+        return bootstrap.default_location_id
+    if location_id != current_user.location_id:
+        check_location(db, location_id)
+    return location_id
+
+@app.get("/locations/", response_model=List[schemas.Location])
+def read_locations(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user), _etag: None = Depends(versions.conditional("locations"))):
+    return db.query(models.Location).order_by(models.Location.id).all()
+
+@app.post("/locations/", response_model=schemas.Location)
+def create_location(location: schemas.LocationCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
+    check_global(current_user)
+    if db.query(models.Location.id).filter(models.Location.name == location.name).first():
+        raise HTTPException(status_code=400, detail="Location already exists")
+    db_location = models.Location(name=location.name)
+    db.add(db_location)
+    db.commit()
+    versions.bump("locations")
+    db.refresh(db_location)
+    return db_location
+
+@app.put("/locations/{location_id}", response_model=schemas.Location)
+def update_location(location_id: int, location: schemas.LocationCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
+    check_global(current_user)
+    db_location = db.query(models.Location).filter(models.Location.id == location_id).first()
+    if not db_location:
+        raise HTTPException(status_code=404, detail="Location not found")
+    if db.query(models.Location.id).filter(models.Location.name == location.name, models.Location.id != location_id).first():
+        raise HTTPException(status_code=400, detail="Location already exists")
+    db_location.name = location.name
+    db.commit()
+    versions.bump("locations")
+    db.refresh(db_location)
+    return db_location
+
 # --- Auth Endpoints ---
 
 @app.post("/token", response_model=schemas.Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(auth.get_async_db)):
     print(f"LOGIN ATTEMPT: {form_data.username}")
-    user = db.query(models.User).filter(models.User.username == form_data.username).first()
+    user = await auth.get_user_by_username(db, form_data.username)
     if not user:
         print(f"LOGIN FAILED: User {form_data.username} not found")
         raise HTTPException(
@@ -75,7 +134,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not auth.verify_password(form_data.password, user.hashed_password):
+    if not await auth.verify_password_async(form_data.password, user.hashed_password):
         print(f"LOGIN FAILED: Password mismatch for {form_data.username}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -83,6 +142,12 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    if auth.needs_rehash(user.hashed_password):
+        # Stored with a different bcrypt cost than BCRYPT_ROUNDS; upgrade it while we know the password
+        user.hashed_password = await auth.get_password_hash_async(form_data.password)
+        await db.commit()
+        print(f"LOGIN: Rehashed password for {form_data.username} with cost {auth.BCRYPT_ROUNDS}")
+    
     access_token_expires = timedelta(minutes=auth.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
         data={"sub": user.username, "role": user.role}, expires_delta=access_token_expires
@@ -90,18 +155,6 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     print(f"LOGIN SUCCESS: {form_data.username}")
     return {"access_token": access_token, "token_type": "bearer"}
 
-@app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
-    db_user = db.query(models.User).filter(models.User.username == user.username).first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
-    hashed_password = auth.get_password_hash(user.password)
-    db_user = models.User(username=user.username, hashed_password=hashed_password, role=user.role)
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
-
 # --- Logic Endpoints ---
 
 @app.post("/calculate-vueltas", response_model=schemas.VueltasCalculationResponse)
@@ -111,9 +164,10 @@ def calculate_vueltas(request: schemas.VueltasCalculationRequest):
     return {"total_today": total_today, "rides_today": rides_today}
 
 @app.get("/last-record", response_model=schemas.DailyRecord)
-def get_last_record(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    # Get the most recent record to find the previous accumulated total
-    last_record = db.query(models.DailyRecord).order_by(models.DailyRecord.id.desc()).first()
+def get_last_record(location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user), _etag: None = Depends(versions.conditional("daily_records"))):
+    # Get the most recent record of the location to find the previous accumulated total
+    location_id = scoped_location(current_user, location_id) or bootstrap.default_location_id
+    last_record = db.query(models.DailyRecord).filter(models.DailyRecord.location_id == location_id).order_by(models.DailyRecord.date.desc(), models.DailyRecord.id.desc()).first()
     if not last_record:
         # Return a dummy record if no history exists
         return models.DailyRecord(
@@ -127,33 +181,162 @@ def get_last_record(db: Session = Depends(get_db), current_user: models.User = D
 
 @app.post("/records/", response_model=schemas.DailyRecord)
 def create_daily_record(record: schemas.DailyRecordCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    db_record = models.DailyRecord(**record.dict(), submitted_by=current_user.username)
+    location_id = writable_location(db, current_user, record.location_id)
+    db_record = models.DailyRecord(**{**record.dict(), "location_id": location_id}, submitted_by=current_user.username)
     db.add(db_record)
+    aggregates.apply(db, aggregates.snapshot(db_record))
+    db.flush()
+    # A backdated record shifts the odometer of every later day
+    chain.recompute_after_change(db, (db_record.location_id, db_record.date, db_record.id))
     db.commit()
+    versions.bump("daily_records")
     db.refresh(db_record)
     return db_record
 
-@app.get("/records/", response_model=List[schemas.DailyRecord])
-def read_records(skip: int = 0, limit: int = 100, date: str = None, month: str = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    query = db.query(models.DailyRecord)
+MAX_BATCH_SIZE = 1000
+
+@app.post("/records/batch", response_model=schemas.RecordBatchResult)
+def create_daily_records_batch(items: List[Any] = Body(...), db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
+    # Offline tablets and month backfills: each item is validated on its own and invalid ones
+    # are reported without rejecting the rest; the valid ones go in with one bulk INSERT,
+    # one aggregates update and one commit
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} records per batch")
+
+    results = []
+    rows = []
+    locations = {}
+    for index, item in enumerate(items):
+        try:
+            record = schemas.DailyRecordCreate.parse_obj(item)
+        except ValidationError as e:
+            results.append({"index": index, "ok": False, "errors": e.errors()})
+            continue
+        if record.location_id not in locations:
+            # A forbidden or unknown location fails only the items that name it
+            try:
+                locations[record.location_id] = writable_location(db, current_user, record.location_id)
+            except HTTPException as e:
+                locations[record.location_id] = e
+        if isinstance(locations[record.location_id], HTTPException):
+            error = locations[record.location_id]
+            results.append({"index": index, "ok": False, "errors": [{"loc": ["location_id"], "msg": error.detail, "type": "value_error.location"}]})
+            continue
+        rows.append({**record.dict(), "location_id": locations[record.location_id], "submitted_by": current_user.username})
+        results.append({"index": index, "ok": True})
+
+    if rows:
+        # executemany with RETURNING, ids in the same order as the rows
+        ids = db.execute(
+            insert(models.DailyRecord).returning(models.DailyRecord.id, sort_by_parameter_order=True), rows
+        ).scalars().all()
+        aggregates.apply_many(db, [aggregates.snapshot(row) for row in rows])
+        chain.recompute_after_change(db, *((row["location_id"], row["date"], row_id) for row, row_id in zip(rows, ids)))
+        db.commit()
+        versions.bump("daily_records")
+        created = iter(ids)
+        for result in results:
+            if result["ok"]:
+                result["id"] = next(created)
+
+    return {"created": len(rows), "failed": len(items) - len(rows), "results": results}
+
+def parse_date(value: str, fmt: str = "%Y-%m-%d"):
+    try:
+        return datetime.strptime(value, fmt).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+
+def month_range(month: str):
+    # "YYYY-MM" -> [first day of month, first day of next month)
+    start = parse_date(month, "%Y-%m")
+    end = date_type(start.year + 1, 1, 1) if start.month == 12 else date_type(start.year, start.month + 1, 1)
+    return start, end
+
+def record_filters(date: str = None, month: str = None, date_from: str = None, date_to: str = None, location_id: int = None):
+    conditions = []
+    if location_id is not None:
+        # Leads the (location_id, date, id) index
+        conditions.append(models.DailyRecord.location_id == location_id)
     if date:
-        query = query.filter(models.DailyRecord.date == date)
+        conditions.append(models.DailyRecord.date == parse_date(date))
     if month:
-        # month format YYYY-MM
-        query = query.filter(models.DailyRecord.date.like(f"{month}%"))
-    records = query.order_by(models.DailyRecord.date.desc()).offset(skip).limit(limit).all()
-    return records
+        # month format YYYY-MM, filtered as a range so it can use the (date, id) index
+        start, end = month_range(month)
+        conditions += [models.DailyRecord.date >= start, models.DailyRecord.date < end]
+    if date_from:
+        conditions.append(models.DailyRecord.date >= parse_date(date_from))
+    if date_to:
+        conditions.append(models.DailyRecord.date <= parse_date(date_to))
+    return conditions
+
+# Columns for the list fast path, in schema order. Dates are read as text: NULL becomes the
+# "" placeholder and no date objects are built just to be formatted again.
+RECORD_FIELDS = fastjson.fields(schemas.DailyRecord)
+RECORD_COLUMNS = fastjson.columns(
+    models.DailyRecord, RECORD_FIELDS, date=func.coalesce(cast(models.DailyRecord.date, String), "")
+)
+
+@app.get("/records/", response_model=List[schemas.DailyRecord])
+def read_records(response: Response, skip: int = 0, limit: int = 100, cursor: str = None, date: str = None, month: str = None, date_from: str = None, date_to: str = None, location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user), _etag: None = Depends(versions.conditional("daily_records"))):
+    location_id = scoped_location(current_user, location_id)
+    query = db.query(*RECORD_COLUMNS).filter(*record_filters(date, month, date_from, date_to, location_id))
+    query = query.order_by(models.DailyRecord.date.desc(), models.DailyRecord.id.desc())
+
+    if cursor:
+        # Keyset mode: seek past the last row of the previous page (skip is ignored)
+        try:
+            records = pagination.keyset_page(db, query, models.DailyRecord.date, models.DailyRecord.id, cursor, limit)
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        records = query.offset(skip).limit(limit).all()
+
+    # A full page may have more rows after it; hand out a cursor for the next one
+    if records and len(records) == limit:
+        last = records[-1]
+        response.headers[pagination.NEXT_CURSOR_HEADER] = pagination.encode_cursor(last.date, last.id)
+    return fastjson.respond(fastjson.as_dicts(RECORD_FIELDS, records), response)
+
+@app.get("/records/export")
+def export_records(format: str = "csv", date: str = None, month: str = None, date_from: str = None, date_to: str = None, location_id: int = None, current_user: models.User = Depends(auth.get_current_active_admin)):
+    if format not in export.STREAMS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}. Use csv, xlsx or parquet")
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+    location_id = scoped_location(current_user, location_id)
+    conditions = record_filters(date, month, date_from, date_to, location_id)
+    site = f"_location{location_id}" if location_id is not None else ""
+    filename = f"daily_records{site}_{month or date or 'all'}.{format}"
+    return StreamingResponse(
+        export.STREAMS[format](conditions),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 @app.put("/records/{record_id}", response_model=schemas.DailyRecord)
 def update_record(record_id: int, record: schemas.DailyRecordCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
     db_record = db.query(models.DailyRecord).filter(models.DailyRecord.id == record_id).first()
     if not db_record:
         raise HTTPException(status_code=404, detail="Record not found")
+    check_owner(current_user, db_record.location_id)
     
-    for key, value in record.dict().items():
+    old_snapshot = aggregates.snapshot(db_record)
+    old_position = (db_record.location_id, db_record.date, db_record.id)
+    data = record.dict()
+    # Without a location_id the record stays where it is
+    location_id = data.pop("location_id")
+    if location_id is not None:
+        db_record.location_id = writable_location(db, current_user, location_id)
+    for key, value in data.items():
         setattr(db_record, key, value)
+    aggregates.apply(db, old_snapshot, sign=-1)
+    aggregates.apply(db, aggregates.snapshot(db_record))
+    # Rides, date or location changed: rebuild the affected chains from the earliest position
+    chain.recompute_after_change(db, old_position, (db_record.location_id, db_record.date, db_record.id))
     
     db.commit()
+    versions.bump("daily_records")
     db.refresh(db_record)
     return db_record
 
@@ -162,117 +345,48 @@ def delete_record(record_id: int, db: Session = Depends(get_db), current_user: m
     db_record = db.query(models.DailyRecord).filter(models.DailyRecord.id == record_id).first()
     if not db_record:
         raise HTTPException(status_code=404, detail="Record not found")
+    check_owner(current_user, db_record.location_id)
     
+    aggregates.apply(db, aggregates.snapshot(db_record), sign=-1)
+    position = (db_record.location_id, db_record.date, db_record.id)
     db.delete(db_record)
+    chain.recompute_after_change(db, position)
     db.commit()
+    versions.bump("daily_records")
     return {"ok": True}
 
-# --- Init Script ---
-@app.on_event("startup")
-def startup_event():
-    db = database.SessionLocal()
-    # Create default admin if not exists
-    user = db.query(models.User).filter(models.User.username == "admin").first()
-    if not user:
-        hashed_password = auth.get_password_hash("admin123") # Default password
-        db_user = models.User(username="admin", hashed_password=hashed_password, role="admin")
-        db.add(db_user)
-        db.commit()
-        print("Created default admin user: admin / admin123")
-    db.close()
-    
-    # Keep Alive Mechanism
-    import threading
-    import time
-    import requests
-    
-    def keep_alive():
-        url = os.getenv("BACKEND_URL")
-        if url:
-            print(f"Starting keep-alive for {url}")
-            while True:
-                try:
-                    time.sleep(14 * 60) # 14 minutes
-                    print(f"Pinging {url} to keep alive...")
-                    requests.get(f"{url}/health")
-                except Exception as e:
-                    print(f"Keep-alive ping failed: {e}")
-        else:
-            print("No BACKEND_URL set, skipping keep-alive.")
-
-    threading.Thread(target=keep_alive, daemon=True).start()
-
-
 @app.get("/admin/dashboard-stats", response_model=schemas.DashboardStats)
-def get_dashboard_stats(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
+def get_dashboard_stats(response: Response, location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin), _etag: None = Depends(versions.conditional("daily_records"))):
+    location_id = scoped_location(current_user, location_id)
+    location = aggregates.ALL_LOCATIONS if location_id is None else location_id
     try:
-        records = db.query(models.DailyRecord).order_by(models.DailyRecord.date.asc()).all()
-        
-        total_revenue = 0.0
-        total_rides = 0
-        records_count = len(records)
-        daily_stats = []
-        
-        # New Aggregations
-        sales_by_weekday = {day: 0.0 for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]}
-        worker_stats = {} # { name: { rides: 0, revenue: 0 } }
-
-        for record in records:
-            income = record.daily_cash_generated or 0.0
-            rides = record.effective_rides or 0
-            
-            total_revenue += income
-            total_rides += rides
-            
-            # Weekday Analysis
-            try:
-                # record.date is String "YYYY-MM-DD" in DailyRecord
-                if record.date:
-                    date_obj = datetime.strptime(record.date, "%Y-%m-%d")
-                    day_name = date_obj.strftime("%A")
-                    if day_name in sales_by_weekday:
-                        sales_by_weekday[day_name] += income
-            except Exception as e:
-                print(f"Error parsing date for record {record.id}: {e}")
-                pass
-                
-            # Worker Analysis
-            if record.worker_name:
-                w_name = record.worker_name.strip()
-                if w_name:
-                    if w_name not in worker_stats:
-                        worker_stats[w_name] = {"rides": 0, "revenue": 0}
-                    worker_stats[w_name]["rides"] += rides
-                    worker_stats[w_name]["revenue"] += income
-
+        # Totals, weekday and worker breakdowns come from the summary tables
+        stats = aggregates.read_stats(db, location)
+        records_count = stats["records_count"]
+        total_revenue = stats["total_revenue"]
         average_daily_income = total_revenue / records_count if records_count > 0 else 0
-        
-        recent_records = records[-30:] if records_count > 30 else records
-        for record in recent_records:
-            daily_stats.append(schemas.DailyStats(
-                date=record.date or "Unknown",
-                total_income=record.daily_cash_generated or 0.0,
-                total_rides=record.effective_rides or 0
-            ))
+
+        # Last 30 days (index scan on date, newest first)
+        daily_stats = aggregates.recent_daily_stats(db, days=30, location=location)
         
         # Format Response Lists
-        sales_by_weekday_list = [{"day": k, "amount": v} for k, v in sales_by_weekday.items()]
+        sales_by_weekday_list = [{"day": k, "amount": v} for k, v in stats["sales_by_weekday"].items()]
         
         top_workers_list = [
             {"name": k, "total_rides": v["rides"], "total_generated": v["revenue"]} 
-            for k, v in worker_stats.items()
+            for k, v in stats["workers"].items()
         ]
         top_workers_list.sort(key=lambda x: x["total_generated"], reverse=True)
 
-        return {
+        return fastjson.respond({
             "total_revenue": total_revenue,
-            "total_rides": total_rides,
+            "total_rides": stats["total_rides"],
             "records_count": records_count,
             "average_daily_income": average_daily_income,
             "daily_stats": daily_stats,
             "sales_by_weekday": sales_by_weekday_list,
             "top_workers": top_workers_list
-        }
+        }, response)
     except Exception as e:
         print(f"CRITICAL ERROR in dashboard_stats: {e}")
         # Return empty safe response instead of 500
@@ -281,86 +395,138 @@ def get_dashboard_stats(db: Session = Depends(get_db), current_user: models.User
             "daily_stats": [], "sales_by_weekday": [], "top_workers": []
         }
 
-@app.post("/schedules/bulk")
-def create_bulk_schedule(bulk_data: schemas.BulkScheduleCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
-    try:
-        start_date = datetime.strptime(bulk_data.start_date, "%Y-%m-%d").date()
-        end_date = datetime.strptime(bulk_data.end_date, "%Y-%m-%d").date()
-        
-        current_date_iter = start_date
-        created_count = 0
+@app.get("/admin/stats", response_model=schemas.RangeStats)
+def get_range_stats(response: Response, date_from: str = Query(None, alias="from"), date_to: str = Query(None, alias="to"), granularity: str = "day", worker: str = None, location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin), _etag: None = Depends(versions.conditional("daily_records"))):
+    # Totals and a day/week/month series for any date range, from the running totals index
+    if granularity not in aggregates.GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be day, week or month")
+    start = parse_date(date_from) if date_from else None
+    end = parse_date(date_to) if date_to else None
+    if start and end and start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    location_id = scoped_location(current_user, location_id)
+    location = aggregates.ALL_LOCATIONS if location_id is None else location_id
+    stats = aggregates.range_stats(db, start, end, granularity, worker, location)
+    return fastjson.respond({
+        "date_from": date_from, "date_to": date_to, "granularity": granularity, "worker": worker, **stats
+    }, response)
+
+def bulk_schedule_slots(bulk_data: schemas.BulkScheduleCreate, start_date, end_date):
+    # (date, start_time, end_time) for every day the bulk request covers; same for every user
+    # Define Shift Times
+    TIME_T_START, TIME_T_END = "10:00", "20:00"
+    TIME_A_START, TIME_A_END = "10:00", "17:30"
+    TIME_C_START, TIME_C_END = "12:30", "20:00"
+    
+    current_date_iter = start_date
+    while current_date_iter <= end_date:
+        weekday = current_date_iter.weekday() # 0=Monday, 6=Sunday
         
-        # Define Shift Times
-        TIME_T_START, TIME_T_END = "10:00", "20:00"
-        TIME_A_START, TIME_A_END = "10:00", "17:30"
-        TIME_C_START, TIME_C_END = "12:30", "20:00"
+        should_create = False
+        s_start = bulk_data.start_time
+        s_end = bulk_data.end_time
         
-        while current_date_iter <= end_date:
-            weekday = current_date_iter.weekday() # 0=Monday, 6=Sunday
+        # Logic for Weekend Patterns
+        if bulk_data.weekend_pattern and weekday in [4, 5, 6] : # Fri, Sat, Sun
+            should_create = True
+            week_num = current_date_iter.isocalendar()[1]
+            is_even_week = week_num % 2 == 0
             
-            should_create = False
-            s_start = bulk_data.start_time
-            s_end = bulk_data.end_time
+            # Determine base pattern
+            pattern_type = bulk_data.weekend_pattern # ACA, CAC, ACA_ROTATING, CAC_ROTATING
             
-            # Logic for Weekend Patterns
-            if bulk_data.weekend_pattern and weekday in [4, 5, 6] : # Fri, Sat, Sun
-                should_create = True
-                week_num = current_date_iter.isocalendar()[1]
-                is_even_week = week_num % 2 == 0
+            # Resolve rotating patterns to fixed base pattern for this specific week
+            if pattern_type == "ACA_ROTATING":
+                pattern_type = "ACA" if not is_even_week else "CAC"
+            elif pattern_type == "CAC_ROTATING":
+                pattern_type = "CAC" if not is_even_week else "ACA"
                 
-                # Determine base pattern
-                pattern_type = bulk_data.weekend_pattern # ACA, CAC, ACA_ROTATING, CAC_ROTATING
+            # Apply Base Pattern logic
+            if pattern_type == "ACA":
+                # Fri(4)=A, Sat(5)=C, Sun(6)=A
+                if weekday == 4: s_start, s_end = TIME_A_START, TIME_A_END
+                elif weekday == 5: s_start, s_end = TIME_C_START, TIME_C_END
+                elif weekday == 6: s_start, s_end = TIME_A_START, TIME_A_END
+            elif pattern_type == "CAC":
+                # Fri(4)=C, Sat(5)=A, Sun(6)=C
+                if weekday == 4: s_start, s_end = TIME_C_START, TIME_C_END
+                elif weekday == 5: s_start, s_end = TIME_A_START, TIME_A_END
+                elif weekday == 6: s_start, s_end = TIME_C_START, TIME_C_END
                 
-                # Resolve rotating patterns to fixed base pattern for this specific week
-                if pattern_type == "ACA_ROTATING":
-                    pattern_type = "ACA" if not is_even_week else "CAC"
-                elif pattern_type == "CAC_ROTATING":
-                    pattern_type = "CAC" if not is_even_week else "ACA"
-                    
-                # Apply Base Pattern logic
-                if pattern_type == "ACA":
-                    # Fri(4)=A, Sat(5)=C, Sun(6)=A
-                    if weekday == 4: s_start, s_end = TIME_A_START, TIME_A_END
-                    elif weekday == 5: s_start, s_end = TIME_C_START, TIME_C_END
-                    elif weekday == 6: s_start, s_end = TIME_A_START, TIME_A_END
-                elif pattern_type == "CAC":
-                    # Fri(4)=C, Sat(5)=A, Sun(6)=C
-                    if weekday == 4: s_start, s_end = TIME_C_START, TIME_C_END
-                    elif weekday == 5: s_start, s_end = TIME_A_START, TIME_A_END
-                    elif weekday == 6: s_start, s_end = TIME_C_START, TIME_C_END
-                    
-            # Logic for Regular Days (or weekends if no pattern active)
-            elif weekday in bulk_data.days_of_week:
-                should_create = True
-                
-            if should_create:
-                existing = db.query(models.Schedule).filter(
-                    models.Schedule.user_id == bulk_data.user_id,
-                    models.Schedule.date == current_date_iter
-                ).first()
-                
-                if not existing:
-                    new_schedule = models.Schedule(
-                        user_id=bulk_data.user_id,
-                        date=current_date_iter,
-                        start_time=s_start,
-                        end_time=s_end
-                    )
-                    db.add(new_schedule)
-                    created_count += 1
-            
-            current_date_iter += timedelta(days=1)
+        # Logic for Regular Days (or weekends if no pattern active)
+        elif weekday in bulk_data.days_of_week:
+            should_create = True
             
-        db.commit()
-        return {"message": f"Successfully created {created_count} schedules", "count": created_count}
+        if should_create:
+            yield current_date_iter, s_start, s_end
         
+        current_date_iter += timedelta(days=1)
+
+@app.post("/schedules/bulk")
+def create_bulk_schedule(bulk_data: schemas.BulkScheduleCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
+    try:
+        start_date = datetime.strptime(bulk_data.start_date, "%Y-%m-%d").date()
+        end_date = datetime.strptime(bulk_data.end_date, "%Y-%m-%d").date()
     except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid date format: {e}")
+
+    user_ids = list(dict.fromkeys(([bulk_data.user_id] if bulk_data.user_id is not None else []) + bulk_data.user_ids))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="user_id or user_ids is required")
+
+    try:
+        # user id -> location of their shifts: the requested one, else theirs, else the default
+        default_location = writable_location(db, current_user, bulk_data.location_id)
+        locations = {
+            user_id: default_location if bulk_data.location_id is not None or location_id is None
+            else scoped_location(current_user, location_id)
+            for user_id, location_id in db.query(models.User.id, models.User.location_id).filter(models.User.id.in_(user_ids))
+        }
+        missing = [user_id for user_id in user_ids if user_id not in locations]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Users not found: {missing}")
+
+        # One query for everything already scheduled in the range; conflicts resolved in memory
+        existing = set(
+            db.query(models.Schedule.user_id, models.Schedule.date).filter(
+                models.Schedule.user_id.in_(user_ids),
+                models.Schedule.date >= start_date,
+                models.Schedule.date <= end_date
+            ).all()
+        )
+
+        slots = list(bulk_schedule_slots(bulk_data, start_date, end_date))
+        new_schedules = [
+            {"user_id": user_id, "date": slot_date, "start_time": s_start, "end_time": s_end, "location_id": locations[user_id]}
+            for user_id in user_ids
+            for slot_date, s_start, s_end in slots
+            if (user_id, slot_date) not in existing
+        ]
+        if new_schedules:
+            db.bulk_insert_mappings(models.Schedule, new_schedules)
+        db.commit()
+        versions.bump("schedules")
+
+        created_count = len(new_schedules)
+        return {"message": f"Successfully created {created_count} schedules", "count": created_count}
+        
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error in bulk schedule: {e}")
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics(request: Request):
+    # Prometheus scrape endpoint; set METRICS_TOKEN to require "Authorization: Bearer <token>"
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("authorization") != f"Bearer {token}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/health")
 def health_check():
     return {"status": "ok"}
@@ -372,24 +538,57 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), current
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     hashed_password = auth.get_password_hash(user.password)
-    db_user = models.User(username=user.username, hashed_password=hashed_password, role=user.role)
+    # Site-bound admins can only create users of their own site; only admins may go without one
+    location_id = scoped_location(current_user, user.location_id)
+    if location_id is None and user.role != "admin":
+        location_id = bootstrap.default_location_id
+    db_user = models.User(username=user.username, hashed_password=hashed_password, role=user.role,
+                          location_id=check_location(db, location_id))
     db.add(db_user)
     db.commit()
+    versions.bump("users")
     db.refresh(db_user)
     return db_user
 
+USER_FIELDS = fastjson.fields(schemas.User, exclude=("schedules",))
+USER_COLUMNS = fastjson.columns(models.User, USER_FIELDS)
+SCHEDULE_FIELDS = fastjson.fields(schemas.Schedule)
+SCHEDULE_COLUMNS = fastjson.columns(models.Schedule, SCHEDULE_FIELDS)
+
 @app.get("/users/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+def read_users(response: Response, skip: int = 0, limit: int = 100, include_schedules: bool = True, schedules_from: str = None, schedules_to: str = None, location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user), _etag: None = Depends(versions.conditional("users", "schedules"))):
+    query = db.query(*USER_COLUMNS)
+    location_id = scoped_location(current_user, location_id)
+    if location_id is not None:
+        query = query.filter(models.User.location_id == location_id)
+    rows = query.order_by(models.User.id).offset(skip).limit(limit).all()
+    users = fastjson.as_dicts(USER_FIELDS, rows)
+    schedules_by_user = {}
+    for user in users:
+        user["schedules"] = schedules_by_user[user["id"]] = []
+
+    if include_schedules and users:
+        # One extra SELECT ... WHERE user_id IN (...) for the whole page instead of one per user,
+        # optionally limited to a date window so the payload stays bounded
+        query = db.query(*SCHEDULE_COLUMNS).filter(models.Schedule.user_id.in_(list(schedules_by_user)))
+        if schedules_from:
+            query = query.filter(models.Schedule.date >= parse_date(schedules_from))
+        if schedules_to:
+            query = query.filter(models.Schedule.date <= parse_date(schedules_to))
+        for schedule in fastjson.as_dicts(SCHEDULE_FIELDS, query.order_by(models.Schedule.id)):
+            schedules_by_user[schedule["user_id"]].append(schedule)
+    return fastjson.respond(users, response)
 
 @app.delete("/users/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    check_owner(current_user, user.location_id)
     db.delete(user)
     db.commit()
+    versions.bump("users")
+    auth.invalidate_user(user.username)
     return {"ok": True}
 
 @app.put("/users/{user_id}", response_model=schemas.User)
@@ -397,6 +596,8 @@ def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Dep
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    check_owner(current_user, db_user.location_id)
+    old_username = db_user.username
     
     # Update fields based on what was sent
     update_data = user_update.dict(exclude_unset=True)
@@ -414,15 +615,34 @@ def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Dep
         db_user.username = update_data["username"]
         del update_data["username"]
 
-    # Update remaining fields (role, schedule times, etc.)
+    if "location_id" in update_data:
+        check_owner(current_user, update_data["location_id"])
+        check_location(db, update_data["location_id"])
+
+    # Update remaining fields (role, schedule times, location, etc.)
     for key, value in update_data.items():
         if hasattr(db_user, key):
             setattr(db_user, key, value)
+
+    # No location means every location: only admins keep that (e.g. not after a demotion)
+    if db_user.role != "admin" and db_user.location_id is None:
+        db_user.location_id = bootstrap.default_location_id
         
     db.commit()
+    versions.bump("users")
+    auth.invalidate_user(old_username)
+    auth.invalidate_user(db_user.username)
     db.refresh(db_user)
     return db_user
 
+@app.get("/admin/cache-stats")
+def get_cache_stats(current_user: models.User = Depends(auth.get_current_active_admin)):
+    return {"user_cache": auth.user_cache.stats()}
+
+@app.get("/admin/jobs")
+def get_jobs_status(current_user: models.User = Depends(auth.get_current_active_admin)):
+    return jobs.scheduler.status()
+
 @app.post("/admin/migrate-db")
 def migrate_db(db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin)):
     from sqlalchemy import text
@@ -447,11 +667,62 @@ def migrate_db(db: Session = Depends(get_db), current_user: models.User = Depend
                 results.append(f"Skipped {col} (might exist)")
         
         db.commit()
+        versions.bump("users")
         return {"status": "success", "details": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Schedule Management Endpoints
+MAX_SCHEDULE_WINDOW_DAYS = 366
+
+@app.get("/schedules/", response_model=schemas.ScheduleWindow)
+def read_schedules(response: Response, date_from: str = Query(..., alias="from"), date_to: str = Query(..., alias="to"), user_id: int = None, location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user), _etag: None = Depends(versions.conditional("schedules"))):
+    # Calendar window: one range scan on (user_id, date), (location_id, date, user_id) or
+    # (date, user_id), answered as compact per-user [date, start, end] rows instead of
+    # full schedule objects
+    start = parse_date(date_from)
+    end = parse_date(date_to)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= MAX_SCHEDULE_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCHEDULE_WINDOW_DAYS} days per request")
+
+    query = db.query(
+        models.Schedule.user_id, cast(models.Schedule.date, String),
+        models.Schedule.start_time, models.Schedule.end_time,
+    ).filter(models.Schedule.date >= start, models.Schedule.date <= end)
+    if user_id is not None:
+        query = query.filter(models.Schedule.user_id == user_id)
+    location_id = scoped_location(current_user, location_id)
+    if location_id is not None:
+        query = query.filter(models.Schedule.location_id == location_id)
+    by_user = {}
+    for row_user_id, row_date, start_time, end_time in query.order_by(models.Schedule.date, models.Schedule.user_id):
+        by_user.setdefault(row_user_id, []).append((row_date, start_time, end_time))
+    return fastjson.respond({
+        "date_from": start.isoformat(), "date_to": end.isoformat(),
+        "users": [{"user_id": key, "schedules": by_user[key]} for key in sorted(by_user)],
+    }, response)
+
+@app.get("/admin/coverage", response_model=schemas.CoverageReport)
+def read_coverage(response: Response, date_from: str = Query(..., alias="from"), date_to: str = Query(..., alias="to"), min_staff: int = Query(1, ge=0), open_time: str = Query(coverage.OPEN, alias="open"), close_time: str = Query(coverage.CLOSE, alias="close"), location_id: int = None, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_active_admin), _etag: None = Depends(versions.conditional("schedules"))):
+    # Headcount timeline, understaffed gaps and double bookings per day, from one sweep
+    start = parse_date(date_from)
+    end = parse_date(date_to)
+    if start > end:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if (end - start).days >= MAX_SCHEDULE_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SCHEDULE_WINDOW_DAYS} days per request")
+    # Staffing is per site: without a location, the default one rather than a combined headcount
+    location_id = check_location(db, scoped_location(current_user, location_id))
+    if location_id is None:
+        location_id = bootstrap.default_location_id
+    try:
+        report = coverage.coverage(db, start, end, min_staff, open_time, close_time, location_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fastjson.respond(report, response)
+
 @app.post("/schedules/", response_model=schemas.Schedule)
 def create_schedule(schedule: schemas.ScheduleCreate, db: Session = Depends(get_db), current_user: models.User = Depends(auth.get_current_user)):
     if current_user.role not in ["admin", "manager"]:
@@ -472,9 +743,16 @@ def create_user_schedule(user_id: int, schedule: schemas.ScheduleCreate, db: Ses
     if current_user.role not in ["admin", "manager"]:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_schedule = models.Schedule(**schedule.dict(), user_id=user_id)
+    # uq_schedules_user_date allows one shift per user and day
+    if db.query(models.Schedule.id).filter(models.Schedule.user_id == user_id, models.Schedule.date == schedule.date).first():
+        raise HTTPException(status_code=400, detail=f"User already has a schedule on {schedule.date}")
+    location_id = schedule.location_id
+    if location_id is None:
+        location_id = db.query(models.User.location_id).filter(models.User.id == user_id).scalar()
+    db_schedule = models.Schedule(**{**schedule.dict(), "location_id": writable_location(db, current_user, location_id)}, user_id=user_id)
     db.add(db_schedule)
     db.commit()
+    versions.bump("schedules")
     db.refresh(db_schedule)
     return db_schedule
 
@@ -485,8 +763,10 @@ def delete_schedule(schedule_id: int, db: Session = Depends(get_db), current_use
     schedule = db.query(models.Schedule).filter(models.Schedule.id == schedule_id).first()
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
+    check_owner(current_user, schedule.location_id)
     db.delete(schedule)
     db.commit()
+    versions.bump("schedules")
     return {"ok": True}
 
 @app.get("/debug-token")
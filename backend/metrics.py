@@ -0,0 +1,207 @@
+import bisect
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+# Prometheus metrics without extra dependencies. MetricsMiddleware times every request
+# per route template and counts in-flight requests; engine events count SQL statements
+# and their time, attributed to the current request through a contextvar (it survives
+# FastAPI's threadpool for "def" endpoints and the greenlet bridge of the async engine).
+# Pool checkout wait is measured by wrapping each engine's raw_connection (pool.connect).
+# Everything lives in this process: with several workers each one reports its own numbers.
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+POOL_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _label_text(self, values, extra=None):
+        pairs = list(zip(self.labels, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+            lines += self._samples(items)
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def _samples(self, items):
+        return [f"{self.name}{self._label_text(labels)} {value}" for labels, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Per label set: [count per bucket (non-cumulative) + overflow, sum]
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(labels)
+            if state is None:
+                state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def _samples(self, items):
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_text(labels, ('le', f'{bound:g}'))} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{self._label_text(labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+requests_total = Counter("http_requests_total", "HTTP requests by route and status code.", ("method", "route", "status"))
+request_duration = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+requests_in_flight.inc(amount=0)
+request_queries = Histogram("http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), QUERY_BUCKETS)
+request_db_time = Histogram("http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("method", "route"))
+queries_total = Counter("db_queries_total", "SQL statements executed, including those outside requests.", ("engine",))
+query_seconds_total = Counter("db_query_seconds_total", "Total time spent executing SQL statements.", ("engine",))
+pool_wait = Histogram("db_pool_checkout_seconds", "Time waiting to check a connection out of the pool.", ("engine",), POOL_BUCKETS)
+
+
+class _RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current = ContextVar("request_db_stats", default=None)
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def _route_label(scope):
+    # The route template (/records/{record_id}) keeps label cardinality bounded
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    # Pure ASGI middleware: no BaseHTTPMiddleware overhead and streaming responses pass through
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _RequestStats()
+        token = _current.set(stats)
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            _current.reset(token)
+            method, route = scope["method"], _route_label(scope)
+            requests_total.inc(method, route, str(status_code[0]))
+            request_duration.observe(elapsed, method, route)
+            request_queries.observe(stats.queries, method, route)
+            request_db_time.observe(stats.db_seconds, method, route)
+
+
+def instrument_engine(engine, name):
+    # engine: a sync Engine (for an AsyncEngine pass async_engine.sync_engine)
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        queries_total.inc(name)
+        query_seconds_total.inc(name, amount=elapsed)
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    # Checkout wait includes pool_pre_ping and opening new connections, which is what a
+    # request actually waits for. raw_connection() is the engine's only call into
+    # pool.connect(), and wrapping it survives engine.dispose() replacing the pool.
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection():
+        started = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            pool_wait.observe(time.perf_counter() - started, name)
+
+    engine.raw_connection = timed_raw_connection
@@ -0,0 +1,68 @@
+from sqlalchemy import inspect, text
+from backend.database import engine, SessionLocal
+from backend import models, aggregates, bootstrap
+
+# Adds locations to an existing single-site database:
+#  - creates the locations table and the default location (DEFAULT_LOCATION, "Principal")
+#  - adds location_id to users, schedules and daily_records; existing records and schedules
+#    and every non-admin user move to the default location, admins keep NULL (all locations)
+#  - creates the location-first indexes
+#  - recreates the dashboard summary tables, now keyed by location, and rebuilds them
+# Safe to run more than once.
+
+TABLES = ("users", "schedules", "daily_records")
+STATS_TABLES = ("stats_cumulative", "stats_worker", "stats_weekday", "stats_totals")
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_daily_records_location_date_id ON daily_records (location_id, date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_schedules_location_date_user ON schedules (location_id, date, user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_users_location_id ON users (location_id, id)",
+]
+
+def migrate_locations():
+    models.Base.metadata.create_all(bind=engine, tables=[models.Location.__table__])
+    db = SessionLocal()
+    try:
+        location_id = bootstrap.ensure_location(db)
+    finally:
+        db.close()
+    print(f"Default location: {location_id}")
+
+    inspector = inspect(engine)
+    rebuild_stats = "location_id" not in {col["name"] for col in inspector.get_columns("stats_totals")} \
+        if inspector.has_table("stats_totals") else True
+
+    with engine.begin() as conn:
+        for table in TABLES:
+            columns = {col["name"] for col in inspector.get_columns(table)}
+            if "location_id" not in columns:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN location_id INTEGER REFERENCES locations(id)"))
+                print(f"Added {table}.location_id")
+
+        moved = conn.execute(text("UPDATE daily_records SET location_id = :id WHERE location_id IS NULL"), {"id": location_id}).rowcount
+        print(f"Moved {moved} records to location {location_id}.")
+        moved = conn.execute(text("UPDATE schedules SET location_id = :id WHERE location_id IS NULL"), {"id": location_id}).rowcount
+        print(f"Moved {moved} schedules to location {location_id}.")
+        moved = conn.execute(text("UPDATE users SET location_id = :id WHERE location_id IS NULL AND role != 'admin'"), {"id": location_id}).rowcount
+        print(f"Moved {moved} users to location {location_id}.")
+
+        for statement in INDEXES:
+            conn.execute(text(statement))
+        print("Location indexes ready.")
+
+        if rebuild_stats:
+            # The summary tables changed primary key; they are derived data, so start over
+            for table in STATS_TABLES:
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+            print("Dropped the old dashboard summary tables.")
+
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        aggregates.rebuild(db)
+        db.commit()
+        print("Dashboard aggregates rebuilt.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_locations()
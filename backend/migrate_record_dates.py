@@ -0,0 +1,71 @@
+import re
+from datetime import datetime
+from sqlalchemy import inspect, text
+from backend.database import engine, SessionLocal
+from backend import models, aggregates
+
+# Converts daily_records.date from VARCHAR to a real DATE column and replaces the
+# single-column index with the composite (date, id) index.
+#  - Values that are not YYYY-MM-DD are normalized (or set to NULL if unparseable).
+#  - PostgreSQL: the column type is changed in place with ALTER ... USING.
+#  - SQLite: dates are already stored as YYYY-MM-DD text, which is what the Date type
+#    reads and writes, so only the values and indexes need fixing.
+# On a database from before locations the aggregates rebuild is left to migrate_locations,
+# which must run next (the summary tables are keyed by location).
+# Safe to run more than once.
+
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+KNOWN_FORMATS = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d"]
+
+def normalize(value):
+    value = (value or "").strip()
+    for fmt in KNOWN_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def migrate_record_dates():
+    dialect = engine.dialect.name
+    columns = {col["name"]: col for col in inspect(engine).get_columns("daily_records")}
+    is_text = "CHAR" in str(columns["date"]["type"]).upper() or "TEXT" in str(columns["date"]["type"]).upper()
+
+    with engine.begin() as conn:
+        if is_text:
+            rows = conn.execute(text("SELECT id, date FROM daily_records")).fetchall()
+            fixed = 0
+            for record_id, value in rows:
+                if value is None or ISO_DATE.match(value):
+                    continue
+                new_value = normalize(value)
+                conn.execute(text("UPDATE daily_records SET date = :date WHERE id = :id"), {"date": new_value, "id": record_id})
+                fixed += 1
+                print(f"Record {record_id}: {value!r} -> {new_value!r}")
+            print(f"Normalized {fixed} date values.")
+
+            if dialect == "postgresql":
+                print("Converting daily_records.date to DATE...")
+                conn.execute(text("ALTER TABLE daily_records ALTER COLUMN date TYPE DATE USING date::date"))
+        else:
+            print("daily_records.date is already a DATE column.")
+
+        conn.execute(text("DROP INDEX IF EXISTS ix_daily_records_date"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_daily_records_date_id ON daily_records (date, id)"))
+        print("Index ix_daily_records_date_id ready.")
+
+    # Weekday totals depend on the (possibly normalized) dates
+    if "location_id" not in columns:
+        print("daily_records has no location_id yet; run backend.migrate_locations next to rebuild the aggregates.")
+        return
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        aggregates.rebuild(db)
+        db.commit()
+        print("Dashboard aggregates rebuilt.")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    migrate_record_dates()
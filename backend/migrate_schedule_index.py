@@ -0,0 +1,23 @@
+from sqlalchemy import text
+from backend.database import engine
+
+# Adds the one-shift-per-user-and-day constraint and the calendar window indexes to an
+# existing schedules table (new databases get them from models.py).
+#  - Duplicate (user_id, date) rows are removed first, keeping the most recent one (highest id).
+#  - uq_schedules_user_date is a UNIQUE index, which both SQLite and PostgreSQL can add in place.
+# Safe to run more than once.
+
+def migrate_schedule_index():
+    with engine.begin() as conn:
+        duplicates = conn.execute(text(
+            "DELETE FROM schedules WHERE user_id IS NOT NULL AND date IS NOT NULL AND id NOT IN ("
+            "SELECT MAX(id) FROM schedules WHERE user_id IS NOT NULL AND date IS NOT NULL GROUP BY user_id, date)"
+        )).rowcount
+        print(f"Removed {duplicates} duplicate schedules.")
+
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_schedules_user_date ON schedules (user_id, date)"))
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_schedules_date_user ON schedules (date, user_id)"))
+        print("Indexes uq_schedules_user_date and ix_schedules_date_user ready.")
+
+if __name__ == "__main__":
+    migrate_schedule_index()
@@ -1,135 +1,171 @@
+import argparse
+import json
 import os
-import sqlite3
-from sqlalchemy import create_engine, text
+import time
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import sessionmaker
-from backend import models
-
-# Cloud DB URL
-CLOUD_DATABASE_URL = os.getenv("DATABASE_URL")
-
-if not CLOUD_DATABASE_URL:
-    print("Error: DATABASE_URL is not set.")
-    exit(1)
-
-# Fix for Render/Heroku
-if CLOUD_DATABASE_URL.startswith("psql "):
-    CLOUD_DATABASE_URL = CLOUD_DATABASE_URL.replace("psql ", "", 1)
-CLOUD_DATABASE_URL = CLOUD_DATABASE_URL.strip().strip("'").strip('"')
-if CLOUD_DATABASE_URL.startswith("postgres://"):
-    CLOUD_DATABASE_URL = CLOUD_DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-# Connect to Cloud DB
-cloud_engine = create_engine(CLOUD_DATABASE_URL)
-CloudSession = sessionmaker(bind=cloud_engine)
-cloud_session = CloudSession()
-
-# Connect to Local SQLite
-# We use raw sqlite3 to avoid model conflicts or complex multi-db setup with ORM
-sqlite_conn = sqlite3.connect("dinocars.db")
-sqlite_cursor = sqlite_conn.cursor()
-
-def migrate_users():
-    print("Migrating Users...")
-    sqlite_cursor.execute("SELECT id, username, hashed_password, role FROM users")
-    users = sqlite_cursor.fetchall()
-    
-    count = 0
-    for row in users:
-        # Check if user exists in cloud
-        existing = cloud_session.query(models.User).filter(models.User.username == row[1]).first()
-        if not existing:
-            new_user = models.User(
-                username=row[1],
-                hashed_password=row[2],
-                role=row[3]
-                # created_at will be handled by default
-            )
-            cloud_session.add(new_user)
-            count += 1
-    
-    cloud_session.commit()
-    print(f"Migrated {count} new users.")
-
-def migrate_records():
-    print("Migrating Daily Records...")
-    # Get all columns from sqlite
-    sqlite_cursor.execute("SELECT * FROM daily_records")
-    # Get column names
-    columns = [description[0] for description in sqlite_cursor.description]
-    records = sqlite_cursor.fetchall()
-    
-    count = 0
-    for row in records:
-        row_dict = dict(zip(columns, row))
-        
-        # Check if record exists (match date, rides_today, and total_counted to be sure)
-        existing = cloud_session.query(models.DailyRecord).filter(
-            models.DailyRecord.date == row_dict['date'],
-            models.DailyRecord.rides_today == row_dict.get('rides_today'),
-            models.DailyRecord.total_counted == row_dict.get('total_counted')
-        ).first()
-        
-        if not existing:
-            # Create new record object
-            # We filter out 'id' to let Postgres generate it, or we can keep it if we want exact sync.
-            # Let's keep 'id' to maintain history integrity if possible, but might conflict with sequences.
-            # Safer to let Postgres generate ID, but order matters.
-            # Actually, for history, date is the key.
-            
-            # Remove id from dict
-            if 'id' in row_dict:
-                del row_dict['id']
-                
-            new_record = models.DailyRecord(**row_dict)
-            cloud_session.add(new_record)
-            count += 1
-            
-    cloud_session.commit()
-    print(f"Migrated {count} daily records.")
-
-def migrate_schedules():
-    print("Migrating Schedules...")
-    # This is trickier because user_ids might have changed if we didn't preserve IDs.
-    # But since we match users by username, we can look up the new user_id.
-    
-    sqlite_cursor.execute("SELECT s.day_of_week, s.start_time, s.end_time, u.username FROM schedules s JOIN users u ON s.user_id = u.id")
-    schedules = sqlite_cursor.fetchall()
-    
-    count = 0
-    for row in schedules:
-        day, start, end, username = row
-        
-        # Find user in cloud DB
-        cloud_user = cloud_session.query(models.User).filter(models.User.username == username).first()
-        if cloud_user:
-            # Check if schedule exists
-            existing = cloud_session.query(models.Schedule).filter(
-                models.Schedule.user_id == cloud_user.id,
-                models.Schedule.day_of_week == day,
-                models.Schedule.start_time == start
-            ).first()
-            
-            if not existing:
-                new_schedule = models.Schedule(
-                    user_id=cloud_user.id,
-                    day_of_week=day,
-                    start_time=start,
-                    end_time=end
-                )
-                cloud_session.add(new_schedule)
-                count += 1
-    
-    cloud_session.commit()
-    print(f"Migrated {count} schedules.")
+from backend import models, aggregates
+
+# Syncs a local SQLite database into the cloud database (or any SQLAlchemy URL).
+# Usage:
+#   python -m backend.migrate_to_cloud [--source sqlite:///dinocars.db] [--target URL] [--chunk 1000]
+#   python -m backend.migrate_to_cloud --restart     # ignore the checkpoint and start over
+#
+# Rows are streamed from the source in primary-key order, CHUNK rows at a time, and written
+# with one bulk INSERT ... ON CONFLICT DO NOTHING per chunk, each chunk in its own
+# transaction. After every chunk the last copied id is saved to the checkpoint file, so an
+# interrupted run resumes where it stopped; re-running a finished sync is a no-op.
+#  - locations: ids are preserved (users, records and schedules point at them), copied first
+#  - users: matched by username (target ids are kept, schedules are remapped)
+#  - daily_records, schedules: ids are preserved; rows whose id already exists are skipped
+
+DEFAULT_CHECKPOINT = ".migrate_checkpoint.json"
+
+def clean_url(url):
+    # Handle pasted psql commands, quotes and Render/Heroku's postgres:// scheme
+    if url.startswith("psql "):
+        url = url.replace("psql ", "", 1)
+    url = url.strip().strip("'").strip('"')
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
+    return url
+
+def insert_ignore(engine, table):
+    dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+    return dialect.insert(table).on_conflict_do_nothing()
+
+class Checkpoint:
+    def __init__(self, path, restart=False):
+        self.path = path
+        self.state = {}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    def last_id(self, table):
+        return self.state.get(table, 0)
+
+    def save(self, table, last_id):
+        self.state[table] = last_id
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+class Sync:
+    def __init__(self, source_url, target_url, chunk, checkpoint):
+        self.source = create_engine(source_url)
+        self.target = create_engine(target_url)
+        self.chunk = chunk
+        self.checkpoint = checkpoint
+        models.Base.metadata.create_all(bind=self.target)
+        self.user_ids = {}  # source user id -> target user id
+
+    def source_columns(self, table):
+        # Older local databases may lack newer columns
+        present = {col["name"] for col in inspect(self.source).get_columns(table.name)}
+        return [column for column in table.columns if column.name in present]
+
+    def chunks(self, table):
+        columns = self.source_columns(table)
+        last_id = self.checkpoint.last_id(table.name)
+        with self.source.connect() as conn:
+            while True:
+                rows = conn.execute(
+                    select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(self.chunk)
+                ).mappings().all()
+                if not rows:
+                    return
+                last_id = rows[-1]["id"]
+                yield [dict(row) for row in rows], last_id
+
+    def copy(self, table, transform=None):
+        started = time.perf_counter()
+        copied = 0
+        for rows, last_id in self.chunks(table):
+            if transform:
+                rows = transform(rows)
+            with self.target.begin() as conn:
+                if rows:
+                    conn.execute(insert_ignore(self.target, table), rows)
+            self.checkpoint.save(table.name, last_id)
+            copied += len(rows)
+        elapsed = time.perf_counter() - started
+        rate = copied / elapsed if elapsed > 0 else 0
+        print(f"{table.name}: {copied} rows in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+
+    def map_users(self):
+        # Small table: resolve every source user to the target id with the same username
+        users = models.User.__table__
+        with self.source.connect() as conn:
+            source_users = dict(conn.execute(select(users.c.username, users.c.id)).all())
+        with self.target.connect() as conn:
+            target_users = dict(conn.execute(select(users.c.username, users.c.id)).all())
+        self.user_ids = {
+            source_id: target_users[username]
+            for username, source_id in source_users.items() if username in target_users
+        }
+
+    def users(self, rows):
+        # Let the target assign ids; an existing username is left untouched
+        return [{key: value for key, value in row.items() if key != "id"} for row in rows]
+
+    def schedules(self, rows):
+        remapped = []
+        for row in rows:
+            target_user = self.user_ids.get(row["user_id"])
+            if target_user is None:
+                continue
+            remapped.append({**row, "user_id": target_user})
+        return remapped
+
+    def fix_sequences(self):
+        # Explicit ids don't advance PostgreSQL sequences; move them past the copied rows
+        if self.target.dialect.name != "postgresql":
+            return
+        with self.target.begin() as conn:
+            for table in ("locations", "daily_records", "schedules"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                ))
+
+    def rebuild_aggregates(self):
+        db = sessionmaker(bind=self.target)()
+        try:
+            aggregates.rebuild(db)
+            db.commit()
+        finally:
+            db.close()
+
+    def run(self):
+        if inspect(self.source).has_table(models.Location.__table__.name):
+            self.copy(models.Location.__table__)
+        self.copy(models.User.__table__, self.users)
+        self.map_users()
+        self.copy(models.DailyRecord.__table__)
+        self.copy(models.Schedule.__table__, self.schedules)
+        self.fix_sequences()
+        self.rebuild_aggregates()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk, resumable sync from SQLite to the cloud database")
+    parser.add_argument("--source", default="sqlite:///dinocars.db")
+    parser.add_argument("--target", default=os.getenv("DATABASE_URL"))
+    parser.add_argument("--chunk", type=int, default=1000)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="Ignore the saved checkpoint")
+    args = parser.parse_args()
+
+    if not args.target:
+        print("Error: DATABASE_URL is not set (or pass --target).")
+        exit(1)
+
+    sync = Sync(clean_url(args.source), clean_url(args.target), args.chunk, Checkpoint(args.checkpoint, args.restart))
     try:
-        migrate_users()
-        migrate_records()
-        migrate_schedules()
+        sync.run()
         print("Migration complete!")
     except Exception as e:
         print(f"Migration failed: {e}")
-    finally:
-        cloud_session.close()
-        sqlite_conn.close()
+        print(f"Progress is saved in {args.checkpoint}; run again to resume.")
+        exit(1)
@@ -1,10 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Date, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
 
+class Location(Base):
+    # A ride site. Records, schedules and users belong to one; composite indexes lead
+    # with location_id so a per-site query only touches that site's rows.
+    __tablename__ = "locations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_location_id", "location_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True)
@@ -16,25 +27,40 @@ class User(Base):
     opening_end_time = Column(String, nullable=True)
     closing_start_time = Column(String, nullable=True)
     closing_end_time = Column(String, nullable=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=True)  # None = every location
     
     schedules = relationship("Schedule", back_populates="user")
 
 class Schedule(Base):
     __tablename__ = "schedules"
+    __table_args__ = (
+        # One shift per user and day; also serves per-user calendar windows
+        Index("uq_schedules_user_date", "user_id", "date", unique=True),
+        # Calendar windows across all users, for one location or all of them
+        Index("ix_schedules_location_date_user", "location_id", "date", "user_id"),
+        Index("ix_schedules_date_user", "date", "user_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     date = Column(Date) # Specific date instead of day_of_week
     start_time = Column(String) # HH:MM
     end_time = Column(String) # HH:MM
+    location_id = Column(Integer, ForeignKey("locations.id"))
 
     user = relationship("User", back_populates="schedules")
 
 class DailyRecord(Base):
     __tablename__ = "daily_records"
+    __table_args__ = (
+        # Month/range filters and "latest first" ordering are range scans on (date, id),
+        # per location on (location_id, date, id); the odometer chain follows the latter
+        Index("ix_daily_records_location_date_id", "location_id", "date", "id"),
+        Index("ix_daily_records_date_id", "date", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    date = Column(String, index=True)  # YYYY-MM-DD
+    date = Column(Date)  # serialized as YYYY-MM-DD
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Data from "Calcular Vueltas"
@@ -59,3 +85,45 @@ class DailyRecord(Base):
     
     worker_name = Column(String, nullable=True) # Nicolas, Catalina, Josefa, Otro
     submitted_by = Column(String)
+    location_id = Column(Integer, ForeignKey("locations.id"))
+
+# --- Dashboard aggregates (kept in sync by aggregates.py) ---
+# Every table is keyed by location_id first; 0 holds the totals over all locations.
+
+class StatsTotals(Base):
+    __tablename__ = "stats_totals"
+
+    location_id = Column(Integer, primary_key=True)  # one row per location
+    total_revenue = Column(Float, default=0.0)
+    total_rides = Column(Integer, default=0)
+    records_count = Column(Integer, default=0)
+
+class StatsWeekday(Base):
+    __tablename__ = "stats_weekday"
+
+    location_id = Column(Integer, primary_key=True)
+    weekday = Column(Integer, primary_key=True)  # 0=Monday, 6=Sunday
+    amount = Column(Float, default=0.0)
+
+class StatsWorker(Base):
+    __tablename__ = "stats_worker"
+
+    location_id = Column(Integer, primary_key=True)
+    name = Column(String, primary_key=True)
+    total_rides = Column(Integer, default=0)
+    total_generated = Column(Float, default=0.0)
+    records_count = Column(Integer, default=0)
+
+class StatsCumulative(Base):
+    # Running totals per location and worker ("" = all workers) through `day`, inclusive;
+    # the sum over any date range is the difference of two rows
+    __tablename__ = "stats_cumulative"
+
+    location_id = Column(Integer, primary_key=True)
+    worker = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    cash = Column(Float, default=0.0)  # daily_cash_generated
+    rides = Column(Integer, default=0)  # effective_rides
+    toys = Column(Float, default=0.0)  # toys_sold_total
+    difference = Column(Float, default=0.0)
+    records = Column(Integer, default=0)
@@ -0,0 +1,57 @@
+import base64
+from datetime import date
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+# Keyset (cursor) pagination for lists ordered by (date DESC, id DESC).
+# A cursor is an opaque token holding the (date, id) of the last row of a page; the next
+# page seeks past it on the (date, id) index instead of counting OFFSET rows.
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row_date, row_id):
+    # row_date: a date, an ISO "YYYY-MM-DD" string, or None/"" for undated rows
+    if isinstance(row_date, date):
+        row_date = row_date.isoformat()
+    raw = f"{row_date or ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw_date, raw_id = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8").split("|")
+        return (date.fromisoformat(raw_date) if raw_date else None), int(raw_id)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+
+def keyset_page(db: Session, query, date_column, id_column, cursor: str, limit: int):
+    # Next page after the cursor for a query ordered by (date DESC, id DESC).
+    # NULL dates sort first on PostgreSQL and last on SQLite, so the order is two segments
+    # (dated / undated rows); each is read with its own index seek rather than one OR
+    # condition, which would make SQLite sort instead of walking the index.
+    row_date, row_id = decode_cursor(cursor)
+    dated = date_column.isnot(None)
+    undated = date_column.is_(None)
+    dated_first = db.get_bind().dialect.name != "postgresql"
+    segments = [dated, undated] if dated_first else [undated, dated]
+    start = 0 if (row_date is not None) == dated_first else 1
+
+    rows = []
+    for n, segment in enumerate(segments[start:]):
+        segment_query = query.filter(segment)
+        if n == 0:
+            if row_date is None:
+                segment_query = segment_query.filter(id_column < row_id)
+            else:
+                segment_query = segment_query.filter(tuple_(date_column, id_column) < tuple_(row_date, row_id))
+        rows += segment_query.limit(limit - len(rows)).all()
+        if len(rows) >= limit:
+            break
+    return rows
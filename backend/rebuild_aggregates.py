@@ -0,0 +1,45 @@
+import sys
+from backend.database import SessionLocal, engine
+from backend import models, aggregates
+
+# Recompute the dashboard summary tables from daily_records and check them against the live path.
+# Usage:
+#   python -m backend.rebuild_aggregates          # rebuild, then verify
+#   python -m backend.rebuild_aggregates --check  # only compare stored vs live, exit 1 on mismatch
+
+def rebuild_aggregates(check_only=False):
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        if not check_only:
+            print("Rebuilding dashboard aggregates...")
+            aggregates.rebuild(db)
+            db.commit()
+
+        # All locations together, then each location on its own
+        problems = []
+        for location in [aggregates.ALL_LOCATIONS] + aggregates.locations_in_use(db):
+            stored = aggregates.read_stats(db, location)
+            found = aggregates.compute_stats(db, location)
+            differences = aggregates.compare(stored, found) + aggregates.compare_cumulative(db, found, location)
+            if location == aggregates.ALL_LOCATIONS:
+                live = found
+            problems += [f"location {location}: {problem}" if location else problem for problem in differences]
+        if problems:
+            print(f"Aggregates do NOT match the live path ({len(problems)} differences):")
+            for problem in problems:
+                print(f"  - {problem}")
+            return False
+
+        print(f"Aggregates OK: {live['records_count']} records, {len(live['workers'])} workers.")
+        return True
+    except Exception as e:
+        print(f"Error rebuilding aggregates: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    ok = rebuild_aggregates(check_only="--check" in sys.argv[1:])
+    exit(0 if ok else 1)
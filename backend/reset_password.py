@@ -32,6 +32,8 @@ def reset_password(username, new_password):
         hashed_password = auth.get_password_hash(new_password)
         user.hashed_password = hashed_password
         db.commit()
+        # Only reaches caches in this process; a running API drops its copy after USER_CACHE_TTL
+        auth.invalidate_user(username)
         print(f"Success! Password for '{username}' has been updated.")
             
     except Exception as e:
@@ -1,11 +1,23 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, validator
+from typing import Optional, List, Tuple, Union
 from datetime import datetime, date
 
+class LocationBase(BaseModel):
+    name: str
+
+class LocationCreate(LocationBase):
+    pass
+
+class Location(LocationBase):
+    id: int
+    class Config:
+        orm_mode = True
+
 class ScheduleBase(BaseModel):
     date: date
     start_time: str
     end_time: str
+    location_id: Optional[int] = None # defaults to the user's location
 
 class ScheduleCreate(ScheduleBase):
     pass
@@ -25,6 +37,7 @@ class UserBase(BaseModel):
     opening_end_time: Optional[str] = None
     closing_start_time: Optional[str] = None
     closing_end_time: Optional[str] = None
+    location_id: Optional[int] = None # None = every location
 
 class UserCreate(UserBase):
     password: str
@@ -39,6 +52,7 @@ class UserUpdate(BaseModel):
     opening_end_time: Optional[str] = None
     closing_start_time: Optional[str] = None
     closing_end_time: Optional[str] = None
+    location_id: Optional[int] = None
 
 class User(UserBase):
     id: int
@@ -55,7 +69,7 @@ class TokenData(BaseModel):
     role: Optional[str] = None
 
 class DailyRecordBase(BaseModel):
-    date: str
+    date: date # YYYY-MM-DD
     total_accumulated_prev: int
     total_accumulated_today: int
     rides_today: int
@@ -72,18 +86,35 @@ class DailyRecordBase(BaseModel):
     toys_sold_details: Optional[str] = ""
     toys_sold_total: float
     worker_name: Optional[str] = None
+    location_id: Optional[int] = None # defaults to the user's location
 
 class DailyRecordCreate(DailyRecordBase):
     pass
 
 class DailyRecord(DailyRecordBase):
+    date: Union[date, str] # "" for the /last-record placeholder and legacy rows without a date
     id: int
     created_at: datetime
     submitted_by: str
 
+    @validator("date", pre=True)
+    def missing_date_as_empty(cls, value):
+        return "" if value is None else value
+
     class Config:
         orm_mode = True
 
+class RecordBatchItem(BaseModel):
+    index: int # position in the submitted list
+    ok: bool
+    id: Optional[int] = None
+    errors: Optional[List[dict]] = None # pydantic errors for rejected items
+
+class RecordBatchResult(BaseModel):
+    created: int
+    failed: int
+    results: List[RecordBatchItem]
+
 class VueltasCalculationRequest(BaseModel):
     dino_counts: List[int] # List of 6 integers
     total_accumulated_prev: int
@@ -107,11 +138,69 @@ class DashboardStats(BaseModel):
     sales_by_weekday: List[dict] # { day: str, amount: float }
     top_workers: List[dict] # { name: str, total_rides: int, total_generated: float }
 
+class RangeTotals(BaseModel):
+    cash: float # daily_cash_generated
+    rides: int # effective_rides
+    toys: float # toys_sold_total
+    difference: float
+    records: int
+
+class RangePoint(RangeTotals):
+    period: str # first day of the day/week/month, YYYY-MM-DD
+
+class RangeStats(BaseModel):
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+    granularity: str
+    worker: Optional[str] = None
+    totals: RangeTotals
+    series: List[RangePoint]
+
 class BulkScheduleCreate(BaseModel):
-    user_id: int
+    user_id: Optional[int] = None
+    user_ids: List[int] = [] # several users at once; merged with user_id
     start_date: str # YYYY-MM-DD
     end_date: str # YYYY-MM-DD
     days_of_week: List[int] # 0=Monday, 6=Sunday
     start_time: str
     end_time: str
     weekend_pattern: Optional[str] = None # ACA, CAC, ACA_ROTATING, CAC_ROTATING
+    location_id: Optional[int] = None # defaults to each user's location
+
+class UserScheduleWindow(BaseModel):
+    user_id: int
+    schedules: List[Tuple[str, str, str]] # [date, start_time, end_time], by date
+
+class ScheduleWindow(BaseModel):
+    date_from: str
+    date_to: str
+    users: List[UserScheduleWindow]
+
+class CoverageSegment(BaseModel):
+    start: str # HH:MM
+    end: str
+    staff: int
+
+class CoverageDay(BaseModel):
+    date: str
+    timeline: List[CoverageSegment]
+    gaps: List[CoverageSegment]
+    understaffed_minutes: int
+
+class DoubleBooking(BaseModel):
+    user_id: int
+    date: str
+    start: str # overlap window, HH:MM
+    end: str
+
+class CoverageReport(BaseModel):
+    date_from: str
+    date_to: str
+    min_staff: int
+    open: str
+    close: str
+    shifts: int
+    skipped_shifts: int
+    understaffed_minutes: int
+    days: List[CoverageDay]
+    double_bookings: List[DoubleBooking]
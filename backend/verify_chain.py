@@ -0,0 +1,47 @@
+import sys
+from backend.database import SessionLocal, engine
+from backend import models, chain
+
+# Check the odometer chain (total_accumulated_prev/today) of every daily record in one pass.
+# Usage:
+#   python -m backend.verify_chain         # report broken links, exit 1 if any
+#   python -m backend.verify_chain --fix   # recompute from the first broken record, then verify again
+
+SHOW = 20
+
+def report(checked, problems):
+    if not problems:
+        print(f"Chain OK: {checked} records.")
+        return
+    print(f"Chain has {len(problems)} broken links in {checked} records:")
+    for problem in problems[:SHOW]:
+        print(f"  - location {problem['location_id']}, record {problem['id']} ({problem['date']}): {problem['field']} is {problem['found']}, expected {problem['expected']}")
+    if len(problems) > SHOW:
+        print(f"  ... and {len(problems) - SHOW} more")
+
+def verify_chain(fix=False):
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        checked, problems = chain.verify(db)
+        report(checked, problems)
+        if not problems or not fix:
+            return not problems
+
+        changed = chain.recompute_after_change(db, *((p["location_id"], p["date"], p["id"]) for p in problems))
+        db.commit()
+        print(f"Recomputed each broken chain from its first broken record: {changed} records updated.")
+
+        checked, problems = chain.verify(db)
+        report(checked, problems)
+        return not problems
+    except Exception as e:
+        print(f"Error verifying chain: {e}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    ok = verify_chain(fix="--fix" in sys.argv[1:])
+    exit(0 if ok else 1)
@@ -0,0 +1,62 @@
+import hashlib
+import os
+import threading
+import uuid
+from fastapi import Depends, HTTPException, Request, Response
+from . import auth, models
+
+# Per-table change versions for conditional GETs. Write endpoints bump() the tables
+# they modify after committing; read endpoints send an ETag derived from the versions
+# they depend on and answer If-None-Match with 304 before running any query.
+#
+# Versions live in this process. They start from a random boot id, so a restart never
+# reuses an old ETag. With several worker processes a write in one worker would not be
+# seen by the others, so conditional GETs are disabled when WEB_CONCURRENCY > 1.
+# Writes made outside the API (import/migration scripts) are picked up on restart.
+# The caller's location is part of the key too: the same URL answers per site, and moving
+# a user to another site bumps only "users".
+
+ENABLED = os.getenv("ETAG_ENABLED", "1") == "1" and int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+
+_boot_id = uuid.uuid4().hex
+_versions = {}
+_lock = threading.Lock()
+
+
+def bump(*tables):
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+def current(table):
+    return _versions.get(table, 0)
+
+
+def etag_for(tables, request: Request, scope=None):
+    state = ",".join(f"{table}:{current(table)}" for table in tables)
+    # The query string is part of the key: /records/?month=2025-07 and ?month=2025-08 differ
+    raw = f"{_boot_id}|{state}|{scope}|{request.url.path}?{request.url.query}"
+    return f'W/"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+
+def _matches(if_none_match: str, etag: str):
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: W/"x" and "x" are the same validator
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return "*" in candidates or any(tag in (etag, bare) or tag[2:] == bare for tag in candidates)
+
+
+def conditional(*tables):
+    # Dependency for read endpoints whose response only changes when `tables` change
+    def check(request: Request, response: Response, current_user: models.User = Depends(auth.get_current_user)):
+        if not ENABLED:
+            return
+        etag = etag_for(tables, request, current_user.location_id)
+        # Vary: the same URL answers differently for users tied to different locations
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+    return check
@@ -1,13 +1,17 @@
 'use client';
 
-import { useState } from 'react';
+import { useState, useEffect } from 'react';
 import { ChevronLeft, ChevronRight } from 'lucide-react';
+import api from '@/lib/api';
 
 const DAYS_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'];
 const DAYS_ES = ['Lun', 'Mar', 'Mié', 'Jue', 'Vie', 'Sáb', 'Dom'];
 
-export default function MonthlyScheduleView({ schedules }: { schedules: any[] }) {
+const pad = (n: number) => String(n).padStart(2, '0');
+
+export default function MonthlyScheduleView({ users }: { users: any[] }) {
     const [currentDate, setCurrentDate] = useState(new Date());
+    const [schedules, setSchedules] = useState<any[]>([]);
 
     const getDaysInMonth = (year: number, month: number) => {
         return new Date(year, month + 1, 0).getDate();
@@ -25,6 +29,22 @@ export default function MonthlyScheduleView({ schedules }: { schedules: any[] })
     const daysInMonth = getDaysInMonth(year, month);
     const firstDay = getFirstDayOfMonth(year, month);
 
+    // Only the visible month: GET /schedules/ answers with [date, start, end] rows per user
+    useEffect(() => {
+        const from = `${year}-${pad(month + 1)}-01`;
+        const to = `${year}-${pad(month + 1)}-${pad(daysInMonth)}`;
+        api.get('/schedules/', { params: { from, to } })
+            .then(res => {
+                const usersById = new Map(users.map((u: any) => [u.id, u]));
+                setSchedules(res.data.users.flatMap((entry: any) => {
+                    const user = usersById.get(entry.user_id);
+                    if (!user) return [];
+                    return entry.schedules.map(([date, start_time, end_time]: string[]) => ({ date, start_time, end_time, user }));
+                }));
+            })
+            .catch(e => console.error(e));
+    }, [year, month, daysInMonth, users]);
+
     const prevMonth = () => setCurrentDate(new Date(year, month - 1, 1));
     const nextMonth = () => setCurrentDate(new Date(year, month + 1, 1));
 
@@ -64,7 +84,7 @@ export default function MonthlyScheduleView({ schedules }: { schedules: any[] })
                     if (!date) return <div key={`empty-${index}`} className="bg-slate-800/20 rounded-lg min-h-[100px]"></div>;
 
                     // Find schedules for this specific date
-                    const dateStr = date.toISOString().split('T')[0];
+                    const dateStr = `${year}-${pad(month + 1)}-${pad(date.getDate())}`;
                     const daySchedules = schedules
                         .filter(s => s.date === dateStr)
                         .sort((a, b) => a.start_time.localeCompare(b.start_time));
@@ -78,7 +98,7 @@ export default function MonthlyScheduleView({ schedules }: { schedules: any[] })
                             </div>
                             <div className="space-y-1">
                                 {daySchedules.map(schedule => (
-                                    <div key={`${date.toISOString()}-${schedule.id}`} className={`text-[10px] px-1.5 py-0.5 rounded ${schedule.user.color} text-white truncate`}>
+                                    <div key={`${dateStr}-${schedule.user.id}`} className={`text-[10px] px-1.5 py-0.5 rounded ${schedule.user.color} text-white truncate`}>
                                         <span className="font-bold">{schedule.user.username}</span>
                                         <span className="opacity-75 ml-1">{schedule.start_time}-{schedule.end_time}</span>
                                     </div>
@@ -80,11 +80,17 @@ export default function UserManagement({ currentUser }: { currentUser: any }) {
 
     useEffect(() => {
         loadUsers();
-    }, []);
+    }, [currentWeekStart]);
 
     const loadUsers = async () => {
         try {
-            const res = await api.get('/users/');
+            // Only the visible week's schedules (with their ids, for deleting); the monthly
+            // view fetches its own month from GET /schedules/
+            const weekEnd = new Date(currentWeekStart);
+            weekEnd.setDate(weekEnd.getDate() + 6);
+            const res = await api.get('/users/', {
+                params: { schedules_from: toLocalDateStr(currentWeekStart), schedules_to: toLocalDateStr(weekEnd) }
+            });
             // Assign colors to users
             const usersWithColors = res.data.map((u: any, index: number) => ({
                 ...u,
@@ -442,7 +448,7 @@ export default function UserManagement({ currentUser }: { currentUser: any }) {
                                 </div>
                             </div>
                         ) : (
-                            <MonthlyScheduleView schedules={schedules} />
+                            <MonthlyScheduleView users={users} />
                         )}
                     </div>
 